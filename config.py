@@ -48,4 +48,26 @@ BUTTON_WIDTH = 192
 BUTTON_HEIGHT = 48
 
 # Solving Time
-PROBLEM_SOLVING_TIME = 10 # seconds
\ No newline at end of file
+PROBLEM_SOLVING_TIME = 10 # seconds
+
+# Search
+PUSH_LEVEL_SEARCH = False # Search over box pushes instead of single player steps
+FREEZE_DEADLOCK_CHECK = True # Prune pushes that freeze boxes off their goals
+CORRAL_PRUNING = True # Restrict pushes to PI-corrals and prune proven corral deadlocks
+CORRAL_SEARCH_LIMIT = 500 # Max states in the sub-search that proves a corral deadlock
+DEADLOCK_PATTERNS = True # Learn proven corral deadlocks and reuse them across runs
+DEADLOCK_PATTERN_DIR = "cache/deadlocks/" # One memory-mapped pattern file per level layout
+DEADLOCK_PATTERN_SLOTS = 1 << 16 # Hash table slots per level file (16 bytes each)
+TUNNEL_MACROS = True # Push boxes and walk the player through one-wide tunnels as single edges
+HEURISTIC_CACHE_MB = 64 # Memory cap of each shared heuristic cache (LRU)
+ARA_INITIAL_WEIGHT = 3.0 # Heuristic weight of the first anytime A* (ARA*) pass
+ARA_WEIGHT_STEP = 0.5 # Weight decrease between ARA* passes, down to 1 (optimal)
+PORTFOLIO_ALGORITHMS = ["A*", "BEAM", "EHC", "IDA*"] # Solvers raced on separate cores by PORTFOLIO
+HDA_WORKERS = 4 # Worker processes of hash-distributed A* (HDA*)
+HDA_BATCH_SIZE = 64 # Children buffered per owner before HDA* sends them
+BFS_WORKERS = 4 # Worker processes of the layer-synchronous parallel BFS
+EXTERNAL_BFS_DIR = "cache/external_bfs/" # Scratch directory for the layer files of the external-memory BFS
+EXTERNAL_BFS_MEMORY_MB = 256 # Memory budget of the external-memory BFS sort buffer
+SMA_MEMORY_MB = 64 # Memory budget of the memory-bounded A* (SMA*)
+SMA_NODE_BYTES = 1000 # Rough size of one SMA* node: state, matching and bookkeeping
+IDA_TABLE_BITS = 20 # IDA* transposition table holds 1 << IDA_TABLE_BITS states (18 bytes each)
@@ -1,6 +1,10 @@
 import time
 
+from src.algorithms import Heuristics
 from src.game_state import GameState
+from src.heuristic_cache import get_heuristic_cache
+from src.level_tables import get_level_tables
+from src.node_arena import NodeArena
 from queue import Queue
 from heapq import heappush, heappop
 import heapq
@@ -10,12 +14,14 @@ import sys
 class AlgorithmGenerator:
     @staticmethod
     def dfs_generator(initial_state: GameState):
-        stack = [(initial_state, [])]  # (state, path_so_far)
+        arena = NodeArena()
+        stack = [(arena.add_root(), initial_state)]  # (node_id, state)
         visited = set()
         n_explored_nodes = 0
 
         while stack:
-            current_state, path = stack.pop()
+            node_id, current_state = stack.pop()
+            path = arena.get_path(node_id)
 
             if current_state in visited:
                 continue
@@ -27,7 +33,7 @@ class AlgorithmGenerator:
                 "current_state": current_state,
                 "n_explored": n_explored_nodes,
                 "visited": visited.copy(),
-                "path_so_far": path.copy()
+                "path_so_far": path
             }
 
             if current_state.is_win():
@@ -36,29 +42,31 @@ class AlgorithmGenerator:
 
             for action, action_cost in reversed(current_state.get_possible_actions()):
                 next_state = current_state.apply_action(action, action_cost)
-                stack.append((next_state, path + [(action, action_cost)]))
+                stack.append((arena.add(node_id, action, next_state.cost), next_state))
 
         # Nếu hết mà không có lời giải
         yield {"solution": None, "done": True}
 
     @staticmethod
     def bfs_generator(initial_state: GameState):
+        arena = NodeArena()
         q = Queue()
         visited = set()
         n_explored_nodes = 0
 
-        q.put((initial_state, []))
+        q.put((arena.add_root(), initial_state))
         visited.add(initial_state)
 
         while not q.empty():
-            current_state, path = q.get()
+            node_id, current_state = q.get()
+            path = arena.get_path(node_id)
             n_explored_nodes += 1
 
             yield {
                 "current_state": current_state,
                 "n_explored": n_explored_nodes,
                 "visited": visited.copy(),
-                "path_so_far": path.copy()
+                "path_so_far": path
             }
 
             if current_state.is_win():
@@ -69,7 +77,7 @@ class AlgorithmGenerator:
                 next_state = current_state.apply_action(action, action_cost)
                 if next_state not in visited:
                     visited.add(next_state)
-                    q.put((next_state, path + [(action, action_cost)]))
+                    q.put((arena.add(node_id, action, next_state.cost), next_state))
 
         yield {"solution": None, "done": True}
 
@@ -78,24 +86,26 @@ class AlgorithmGenerator:
         from itertools import count
         counter = count()
         frontier = []
-        heappush(frontier, (initial_state.cost, next(counter), initial_state, []))
+        arena = NodeArena()
+        heappush(frontier, (initial_state.cost, next(counter), arena.add_root(initial_state.cost), initial_state))
         visited = set()
         min_cost = {initial_state: initial_state.cost}
         n_explored_nodes = 0
 
         while frontier:
-            cost, _, current_state, path = heappop(frontier)
+            cost, _, node_id, current_state = heappop(frontier)
 
             if current_state in visited:
                 continue
             visited.add(current_state)
             n_explored_nodes += 1
+            path = arena.get_path(node_id)
 
             yield {
                 "current_state": current_state,
                 "n_explored": n_explored_nodes,
                 "visited": visited.copy(),
-                "path_so_far": path.copy()
+                "path_so_far": path
             }
 
             if current_state.is_win():
@@ -108,45 +118,43 @@ class AlgorithmGenerator:
 
                 if next_state not in min_cost or total_cost < min_cost[next_state]:
                     min_cost[next_state] = total_cost
-                    heappush(frontier, (total_cost, next(counter), next_state, path + [(action, action_cost)]))
+                    next_id = arena.add(node_id, action, total_cost)
+                    heappush(frontier, (total_cost, next(counter), next_id, next_state))
 
         yield {"solution": None, "done": True}
 
     @staticmethod
     def a_star_generator(initial_state: GameState):
         from itertools import count
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        distances = get_level_tables(initial_state.level).nearest_push_distances
+        heuristic_cache = get_heuristic_cache(initial_state.level, "heuristic1")
         counter = count()
 
         def heuristic(state: GameState):
-            h_value = 0
-            for box_position in state.box_positions:
-                if box_position in distances:
-                    h_value += distances[box_position]
-                else:
-                    return float('inf')
-            return h_value
+            return heuristic_cache.get(state, Heuristics.heuristic1, distances)
 
+        arena = NodeArena()
         frontier = []
-        heappush(frontier, (heuristic(initial_state), next(counter), initial_state, [], 0))  # (f, id, state, path, g)
+        heappush(frontier, (heuristic(initial_state), next(counter), arena.add_root(), initial_state, 0))  # (f, id, node_id, state, g)
         min_cost = {initial_state: 0}
         visited = set()
         n_explored_nodes = 0
 
         while frontier:
-            _, _, current_state, path, g = heappop(frontier)
+            _, _, node_id, current_state, g = heappop(frontier)
 
             if current_state in visited:
                 continue
             visited.add(current_state)
             n_explored_nodes += 1
+            path = arena.get_path(node_id)
 
             # Yield thông tin từng bước, bao gồm visited
             yield {
                 "current_state": current_state,
                 "n_explored": n_explored_nodes,
                 "visited": visited.copy(),
-                "path_so_far": path.copy()
+                "path_so_far": path
             }
 
             if current_state.is_win():
@@ -163,7 +171,7 @@ class AlgorithmGenerator:
                 if new_cost < min_cost.get(next_state, float('inf')):
                     min_cost[next_state] = new_cost
                     f = new_cost + heuristic(next_state)
-                    heappush(frontier, (f, next(counter), next_state, path + [(action, action_cost)], new_cost))
+                    heappush(frontier, (f, next(counter), arena.add(node_id, action, new_cost), next_state, new_cost))
 
         # Không tìm thấy lời giải
         yield {
@@ -176,22 +184,24 @@ class AlgorithmGenerator:
         n_explored_nodes = 0
 
         for depth_limit in range(max_depth):
-            stack = [(initial_state, 0, [])]  # (state, depth, path_so_far)
+            arena = NodeArena()
+            stack = [(arena.add_root(), initial_state, 0)]  # (node_id, state, depth)
             visited = set()
 
             while stack:
-                current_state, depth, path = stack.pop()
+                node_id, current_state, depth = stack.pop()
 
                 if current_state in visited:
                     continue
                 visited.add(current_state)
                 n_explored_nodes += 1
+                path = arena.get_path(node_id)
 
                 yield {
                     "current_state": current_state,
                     "n_explored": n_explored_nodes,
                     "visited": visited,
-                    "path_so_far": path.copy()
+                    "path_so_far": path
                 }
 
                 if current_state.is_win():
@@ -204,7 +214,7 @@ class AlgorithmGenerator:
                 if depth < depth_limit:
                     for action, action_cost in reversed(current_state.get_possible_actions()):
                         next_state = current_state.apply_action(action, action_cost)
-                        stack.append((next_state, depth + 1, path + [(action, action_cost)]))
+                        stack.append((arena.add(node_id, action, next_state.cost), next_state, depth + 1))
 
         yield {
             "solution": None,
@@ -214,31 +224,34 @@ class AlgorithmGenerator:
     @staticmethod
     def beam_generator(initial_state: GameState):
         beam_width = 5
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        distances = get_level_tables(initial_state.level).nearest_push_distances
+        heuristic_cache = get_heuristic_cache(initial_state.level, "heuristic1")
 
         def heuristic(state):
-            return sum(distances.get(box, float('inf')) for box in state.box_positions)
+            return heuristic_cache.get(state, Heuristics.heuristic1, distances)
 
         from itertools import count
         counter = count()
-        frontier = [(heuristic(initial_state), next(counter), initial_state, [])]
+        arena = NodeArena()
+        frontier = [(heuristic(initial_state), next(counter), arena.add_root(), initial_state)]
         n_explored_nodes = 0
         visited = set()
 
         while frontier:
             next_frontier = []
 
-            for _, _, current_state, path in frontier:
+            for _, _, node_id, current_state in frontier:
                 if current_state in visited:
                     continue
                 visited.add(current_state)
                 n_explored_nodes += 1
+                path = arena.get_path(node_id)
 
                 yield {
                     "current_state": current_state,
                     "n_explored": n_explored_nodes,
                     "visited": visited.copy(),
-                    "path_so_far": path.copy()
+                    "path_so_far": path
                 }
 
                 if current_state.is_win():
@@ -249,8 +262,8 @@ class AlgorithmGenerator:
                     next_state = current_state.apply_action(action, action_cost)
                     if next_state in visited:
                         continue
-                    next_path = path + [(action, action_cost)]
-                    next_frontier.append((heuristic(next_state), next(counter), next_state, next_path))
+                    next_id = arena.add(node_id, action, next_state.cost)
+                    next_frontier.append((heuristic(next_state), next(counter), next_id, next_state))
 
             frontier = sorted(next_frontier)[:beam_width]
 
@@ -258,26 +271,23 @@ class AlgorithmGenerator:
 
     @staticmethod
     def ida_star_generator(initial_state: GameState):
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        distances = get_level_tables(initial_state.level).nearest_push_distances
+        heuristic_cache = get_heuristic_cache(initial_state.level, "heuristic1")
 
         def heuristic(state: GameState):
-            h_value = 0
-            for box_position in state.box_positions:
-                if box_position not in distances:
-                    return float('inf')
-                h_value += distances[box_position]
-            return h_value
+            return heuristic_cache.get(state, Heuristics.heuristic1, distances)
 
         threshold = heuristic(initial_state)
         n_explored_nodes = 0
 
         while True:
-            stack = [(initial_state, 0, [])]  # (state, g, path_so_far)
+            arena = NodeArena()
+            stack = [(arena.add_root(), initial_state, 0)]  # (node_id, state, g)
             visited = set()
             next_threshold = float('inf')
 
             while stack:
-                current_state, g, path = stack.pop()
+                node_id, current_state, g = stack.pop()
                 f = g + heuristic(current_state)
 
                 if f > threshold:
@@ -288,13 +298,14 @@ class AlgorithmGenerator:
                     continue
                 visited.add(current_state)
                 n_explored_nodes += 1
+                path = arena.get_path(node_id)
 
                 # Yield thông tin tại mỗi bước
                 yield {
                     "current_state": current_state,
                     "n_explored": n_explored_nodes,
                     "visited": visited.copy(),
-                    "path_so_far": path.copy()
+                    "path_so_far": path
                 }
 
                 if current_state.is_win():
@@ -308,8 +319,7 @@ class AlgorithmGenerator:
                     next_state = current_state.apply_action(action, action_cost)
                     if next_state in visited:
                         continue
-                    new_path = path + [(action, action_cost)]
-                    stack.append((next_state, g + action_cost, new_path))
+                    stack.append((arena.add(node_id, action, g + action_cost), next_state, g + action_cost))
 
             if next_threshold == float('inf'):
                 yield {
@@ -320,29 +330,94 @@ class AlgorithmGenerator:
 
             threshold = next_threshold
 
+    @staticmethod
+    def fringe_search_generator(initial_state: GameState):
+        distances = get_level_tables(initial_state.level).nearest_push_distances
+        heuristic_cache = get_heuristic_cache(initial_state.level, "heuristic1")
+
+        def heuristic(state: GameState):
+            return heuristic_cache.get(state, Heuristics.heuristic1, distances)
+
+        arena = NodeArena()
+        cache = {initial_state: (0, arena.add_root())}  # state -> (g, node_id)
+        now = [(initial_state, 0)]  # (state, g)
+        later = []
+        threshold = heuristic(initial_state)
+        visited = set()
+        n_explored_nodes = 0
+
+        while now:
+            next_threshold = float('inf')
+
+            while now:
+                current_state, g = now.pop()
+                if g > cache[current_state][0]:
+                    continue
+
+                f = g + heuristic(current_state)
+                if f > threshold:
+                    next_threshold = min(next_threshold, f)
+                    later.append((current_state, g))
+                    continue
+
+                visited.add(current_state)
+                n_explored_nodes += 1
+                node_id = cache[current_state][1]
+                path = arena.get_path(node_id)
+
+                # Yield thông tin tại mỗi bước
+                yield {
+                    "current_state": current_state,
+                    "n_explored": n_explored_nodes,
+                    "visited": visited.copy(),
+                    "path_so_far": path
+                }
+
+                if current_state.is_win():
+                    yield {
+                        "solution": path,
+                        "done": True
+                    }
+                    return
+
+                for action, action_cost in reversed(current_state.get_possible_actions()):
+                    next_state = current_state.apply_action(action, action_cost)
+                    new_cost = g + action_cost
+                    if new_cost >= cache.get(next_state, (float('inf'),))[0]:
+                        continue
+                    cache[next_state] = (new_cost, arena.add(node_id, action, new_cost))
+                    now.append((next_state, new_cost))
+
+            later.reverse()
+            now, later = later, now
+            threshold = next_threshold
+
+        yield {
+            "solution": None,
+            "done": True
+        }
+
     @staticmethod
     def enforced_hill_climbing_generator(initial_state: GameState):
         from collections import deque
 
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        distances = get_level_tables(initial_state.level).nearest_push_distances
+        heuristic_cache = get_heuristic_cache(initial_state.level, "heuristic1")
 
         def heuristic(state: GameState):
-            h_value = 0
-            for box_position in state.box_positions:
-                if box_position not in distances:
-                    return float('inf')
-                h_value += distances[box_position]
-            return h_value
-
-        def bfs_find_better_state(start_state, current_h, visited_global, path):
+            return heuristic_cache.get(state, Heuristics.heuristic1, distances)
+
+        arena = NodeArena()
+
+        def bfs_find_better_state(start_id, start_state, current_h):
             nonlocal n_explored_nodes
             visited = set()
             queue = deque()
-            queue.append((start_state, []))  # (state, path_extension)
+            queue.append((start_id, start_state))  # (node_id, state)
             visited.add(start_state)
 
             while queue:
-                state, ext_path = queue.popleft()
+                node_id, state = queue.popleft()
                 n_explored_nodes += 1  # ✅ Tăng node đã duyệt
 
                 for action, action_cost in state.get_possible_actions():
@@ -350,18 +425,18 @@ class AlgorithmGenerator:
                     if next_state in visited:
                         continue
                     h = heuristic(next_state)
-                    new_path = ext_path + [(action, action_cost)]
+                    next_id = arena.add(node_id, action, next_state.cost)
 
                     if h < current_h:
-                        return next_state, new_path
+                        return next_id, next_state
 
-                    queue.append((next_state, new_path))
+                    queue.append((next_id, next_state))
                     visited.add(next_state)
 
             return None, None
 
+        current_id = arena.add_root()
         current_state = initial_state
-        path = []
         visited = set()
         n_explored_nodes = 0
 
@@ -369,12 +444,13 @@ class AlgorithmGenerator:
             current_h = heuristic(current_state)
             visited.add(current_state)
             n_explored_nodes += 1
+            path = arena.get_path(current_id)
 
             yield {
                 "current_state": current_state,
                 "n_explored": n_explored_nodes,
                 "visited": visited.copy(),
-                "path_so_far": path.copy()
+                "path_so_far": path
             }
 
             if current_state.is_win():
@@ -387,21 +463,20 @@ class AlgorithmGenerator:
             neighbors = []
             for action, action_cost in current_state.get_possible_actions():
                 next_state = current_state.apply_action(action, action_cost)
-                neighbors.append((heuristic(next_state), next_state, (action, action_cost)))
+                neighbors.append((heuristic(next_state), next_state, action))
 
             better_neighbors = [(h, s, a) for h, s, a in neighbors if h < current_h]
 
             if better_neighbors:
                 _, next_state, action = min(better_neighbors, key=lambda x: x[0])
+                current_id = arena.add(current_id, action, next_state.cost)
                 current_state = next_state
-                path.append(action)
             else:
-                next_state, path_extension = bfs_find_better_state(current_state, current_h, visited, path)
+                current_id, next_state = bfs_find_better_state(current_id, current_state, current_h)
                 if next_state is None:
                     yield {
                         "solution": None,
                         "done": True
                     }
                     return
-                current_state = next_state
-                path += path_extension
\ No newline at end of file
+                current_state = next_state
\ No newline at end of file
@@ -1,123 +1,165 @@
 import time
 
+from config import ARA_INITIAL_WEIGHT, ARA_WEIGHT_STEP, SMA_MEMORY_MB, SMA_NODE_BYTES, IDA_TABLE_BITS
+from src.box_goal_matching import BoxGoalMatcher
+from src.bucket_queue import BucketQueue
 from src.game_state import GameState
-from queue import Queue
+from src.heuristic_cache import get_heuristic_cache, MATCHING_ENTRY_BYTES
+from src.level_tables import get_level_tables, UNREACHABLE_PUSHES, UNREACHABLE_STEPS
+from src.move_generator import MoveGenerator
+from src.node_arena import NodeArena
+from src.static_level import ACTIONS, iter_cells
+from src.transposition_table import TranspositionTable
 from heapq import heappush, heappop
 import heapq
 from itertools import count
 from collections import deque
+from itertools import chain
 import sys
 
+import numpy as np
+
 class Heuristics:
     @staticmethod
     def heuristic1(state: GameState, distances):
+        # distances[cell]: pushes to the nearest goal (LevelTables.nearest_push_distances)
         h_value = 0
-        for box_position in state.box_positions:
-            if box_position in distances:
-                h_value += distances[box_position]
+        for box_cell in state.box_cells():
+            if distances[box_cell] != UNREACHABLE_PUSHES:
+                h_value += distances[box_cell]
             else:
                 h_value += float('inf')
         return h_value
 
+    @staticmethod
+    def heuristic1_delta(parent_state: GameState, parent_h, state: GameState, distances):
+        """heuristic1(state) from the parent's value: only the moved box's term changes."""
+        moved = parent_state.boxes ^ state.boxes
+        if not moved:
+            return parent_h  # Walking move
+        old_cell = (parent_state.boxes & moved).bit_length() - 1
+        new_cell = (state.boxes & moved).bit_length() - 1
+        if moved != (1 << old_cell) | (1 << new_cell) or parent_h == float('inf') or \
+                distances[new_cell] == UNREACHABLE_PUSHES:
+            return Heuristics.heuristic1(state, distances)
+        return parent_h - distances[old_cell] + distances[new_cell]
+
     @staticmethod
     def heuristic2(state, distances):
         h_value = 0
 
-        # --- Part 1: Sum of box-to-goal distances (precomputed distances dict) ---
-        for box_pos in state.box_positions:
-            if box_pos in distances:
-                h_value += distances[box_pos]
+        # --- Part 1: Sum of box-to-goal push distances (precomputed per level) ---
+        for box_cell in state.box_cells():
+            if distances[box_cell] != UNREACHABLE_PUSHES:
+                h_value += distances[box_cell]
             else:
                 h_value += float('inf')  # Penalize unreachable positions
 
-        # --- Part 2: Sum of distances from player to all boxes (greedy + early stop) ---
-        remaining_boxes = set(state.box_positions)
-        visited = set()
-        heap = []
-        heappush(heap, (0, state.player_pos))  # (distance, position)
-
-        while heap and remaining_boxes:
-            dist, pos = heappop(heap)
-            if pos in visited:
-                continue
-            visited.add(pos)
-
-            if pos in remaining_boxes:
+        # --- Part 2: Sum of distances from player to all boxes (precomputed per level) ---
+        tables = get_level_tables(state.level)
+        player_distances = tables.get_player_distances(state.player)
+        for box_cell in state.box_cells():
+            dist = int(player_distances[tables.floor_index[box_cell]])
+            if dist != UNREACHABLE_STEPS:
                 h_value += dist  # Player to box distance
-                remaining_boxes.remove(pos)
-                if not remaining_boxes:
-                    break  # Stop early once all boxes reached
-
-            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                nr, nc = pos[0] + dr, pos[1] + dc
-                next_pos = (nr, nc)
-                if next_pos not in visited and not state.is_wall(next_pos):
-                    heappush(heap, (dist + 1, next_pos))
 
         return h_value
 
     @staticmethod
-    def heuristic3(state: GameState, distances, player_weight=0.5):
+    def heuristic3(state: GameState, matcher: BoxGoalMatcher, player_weight=0.5):
         h_value = 0
 
         # --- Check deadlocks ---
-        for box in state.box_positions:
-            if state.is_deadlock_at(box) and box not in state.goal_positions:
+        for box in state.box_cells():
+            if state.is_deadlock_at(box):
                 return float('inf')
 
-        # --- Part 1: Greedy box-goal matching (no goal used twice) ---
-        unmatched_goals = set(state.goal_positions)
-        box_goal_costs = []
-
-        for box in state.box_positions:
-            if box not in distances:
-                return float('inf')  # Unreachable box
-
-            goal_dists = [(distances[goal], goal) for goal in unmatched_goals if goal in distances]
-            if not goal_dists:
-                return float('inf')  # No reachable goal left
-
-            dist, matched_goal = min(goal_dists)
-            h_value += dist
-            unmatched_goals.remove(matched_goal)
-
-        # --- Part 2 (optional): Player to nearest box (weighted) ---
-        remaining_boxes = set(state.box_positions)
-        visited = set()
-        heap = []
-        heappush(heap, (0, state.player_pos))
+        # --- Part 1: Min-cost box-goal matching (no goal used twice) ---
+        matching = matcher.solve(state.boxes)
+        if matcher.get_heuristic(matching) == float('inf'):
+            return float('inf')  # Some box cannot reach a goal
+        h_value += matching.cost
+
+        # --- Part 2 (optional): Player to boxes (weighted) ---
+        tables = get_level_tables(state.level)
+        player_distances = tables.get_player_distances(state.player)
+        for box_cell in state.box_cells():
+            dist = int(player_distances[tables.floor_index[box_cell]])
+            if dist != UNREACHABLE_STEPS:
+                h_value += dist * player_weight
 
-        while heap and remaining_boxes:
-            dist, pos = heappop(heap)
-            if pos in visited:
-                continue
-            visited.add(pos)
+        return h_value
 
-            if pos in remaining_boxes:
-                h_value += dist * player_weight
-                remaining_boxes.remove(pos)
-                if not remaining_boxes:
-                    break
+    @staticmethod
+    def get_box_cell_array(states):
+        """Box cells of every state as an (n_states, n_boxes) int array for player_distance_batch."""
+        if not states:
+            return np.empty((0, 0), dtype=np.int32)
+        n_boxes = bin(states[0].boxes).count('1')
+        cells = np.fromiter(chain.from_iterable(state.box_cells() for state in states),
+                            dtype=np.int32, count=len(states) * n_boxes)
+        return cells.reshape(len(states), n_boxes)
 
-            for dr, dc in [(-1,0), (1,0), (0,-1), (0,1)]:
-                nr, nc = pos[0] + dr, pos[1] + dc
-                next_pos = (nr, nc)
-                if next_pos not in visited and not state.is_wall(next_pos):
-                    heappush(heap, (dist + 1, next_pos))
+    @staticmethod
+    def player_distance_batch(box_cells, player_cells, tables):
+        """Part 2 of heuristic2 (player to every box) for many states at once."""
+        floor_index = tables.floor_index_array
+        player_distances = tables.floor_distances[floor_index[player_cells][:, None], floor_index[box_cells]]
+        return np.where(player_distances == UNREACHABLE_STEPS, 0, player_distances).sum(axis=1)
 
+    @staticmethod
+    def matching_heuristic(state: GameState, matching, matcher: BoxGoalMatcher, push_level):
+        """Pushes of the box-goal matching, plus player_to_box in step-level search."""
+        h_value = matcher.get_heuristic(matching)
+        if not push_level:
+            h_value += Heuristics.player_to_box(state)  # Walking only costs in step-level search
         return h_value
 
+    @staticmethod
+    def player_to_box(state: GameState):
+        """Admissible walking term: steps the player needs before it can make the next push."""
+        if not state.boxes or state.is_win():
+            return 0
+        tables = get_level_tables(state.level)
+        player_distances = tables.get_player_distances(state.player)
+        floor_index = tables.floor_index
+        nearest = min(int(player_distances[floor_index[box_cell]]) for box_cell in state.box_cells())
+        return 0 if nearest == UNREACHABLE_STEPS else nearest - 1
+
+class BoundedNode:
+    """Search node of the memory-bounded A*; only nodes in memory exist, leaves included."""
+
+    __slots__ = ('state', 'g', 'f', 'depth', 'parent', 'action', 'action_cost', 'matching',
+                 'children', 'forgotten_f', 'covered_f')
+
+    def __init__(self, state, g, f, depth, parent, action, action_cost, matching):
+        self.state = state
+        self.g = g
+        self.f = f
+        self.depth = depth
+        self.parent = parent  # Node id, or None for the root
+        self.action = action
+        self.action_cost = action_cost
+        self.matching = matching
+        self.children = None  # Ids of the children in memory; None while the node is an open leaf
+        self.forgotten_f = float('inf')  # Lowest f among the children dropped from memory
+        self.covered_f = float('inf')  # Lowest f among the children left out as already in memory
+
 class Algorithms:
     @staticmethod
-    def dfs(initial_state: GameState):
+    def dfs(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        arena = NodeArena()
         visited = set()
-        stack = [initial_state]
+        stack = [(arena.add_root(), root_state)]
         n_explored_nodes = 0
 
         while stack:
-            current_state = stack.pop()
+            node_id, current_state = stack.pop()
 
             if current_state in visited:
                 continue
@@ -127,126 +169,434 @@ class Algorithms:
 
             if current_state.is_win():
                 solving_time = time.time() - start_time
-                return current_state.get_path(), n_explored_nodes, solving_time
+                return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
-            for action, action_cost in reversed(current_state.get_possible_actions()):
-                next_state = current_state.apply_action(action, action_cost)
-                stack.append(next_state)
+            for action, action_cost, next_state in reversed(moves.get_successors(current_state)):
+                stack.append((arena.add(node_id, action, next_state.cost), next_state))
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
     @staticmethod
-    def bfs(initial_state: GameState):
+    def bfs(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
-        q = Queue()
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        arena = NodeArena()
+        q = deque()
         visited = set()
         n_explored_nodes = 0
 
-        q.put(initial_state)
-        visited.add(initial_state)
+        q.append((arena.add_root(), root_state))
+        visited.add(root_state)
 
-        while not q.empty():
-            current_state = q.get()
+        while q:
+            node_id, current_state = q.popleft()
             n_explored_nodes += 1
 
             if current_state.is_win():
                 solving_time = time.time() - start_time
-                return current_state.get_path(), n_explored_nodes, solving_time
-
-            for action, action_cost in current_state.get_possible_actions():
-                next_state = current_state.apply_action(action, action_cost)
+                return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
+            for action, action_cost, next_state in moves.get_successors(current_state):
                 if next_state in visited:
                     continue
 
-                q.put(next_state)
+                q.append((arena.add(node_id, action, next_state.cost), next_state))
                 visited.add(next_state)
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
     @staticmethod
-    def ucs(initial_state: GameState):
+    def ucs(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
-        counter = count()  # Handle case if 2 states have the same cost, it will compare id next
-        frontier = []
-        heapq.heappush(frontier, (initial_state.cost, next(counter), initial_state))
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        arena = NodeArena()
+        frontier = BucketQueue()  # Action costs are small integers: one bucket per g
+        frontier.push(root_state.cost, 0, (arena.add_root(root_state.cost), root_state))
         visited = set()
-        min_cost = {initial_state: initial_state.cost}
+        min_cost = {root_state: root_state.cost}
         n_explored_nodes = 0
 
         while frontier:
-            _, _, current_state = heapq.heappop(frontier)
+            _, (node_id, current_state) = frontier.pop()
 
             if current_state in visited:
-                continue
+                continue  # Stale entry: the state was already reached more cheaply
             visited.add(current_state)
             n_explored_nodes += 1
 
             if current_state.is_win():
                 solving_time = time.time() - start_time
-                return current_state.get_path(), n_explored_nodes, solving_time
+                return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
-            for action, action_cost in current_state.get_possible_actions():
-                next_state = current_state.apply_action(action, action_cost)
+            for action, action_cost, next_state in moves.get_successors(current_state):
                 total_cost = next_state.cost
 
                 if next_state not in min_cost or total_cost < min_cost[next_state]:
                     min_cost[next_state] = total_cost
-                    heapq.heappush(frontier, (total_cost, next(counter), next_state))
+                    next_id = arena.add(node_id, action, total_cost)
+                    frontier.push(total_cost, 0, (next_id, next_state))
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
     @staticmethod
-    def a_star(initial_state: GameState):
+    def a_star(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
-        counter = count()
-
-        frontier = []
-        heappush(frontier, (Heuristics.heuristic1(initial_state, distances), next(counter), initial_state))
-        min_cost = {initial_state: 0}
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        matcher = BoxGoalMatcher(root_state.level)
+        matching_cache = get_heuristic_cache(root_state.level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+        root_matching = matching_cache.get(root_state, matcher.get_matching)
+
+        arena = NodeArena()
+        # f = g + h is a small integer: one bucket per f, ties broken on the lower h
+        frontier = BucketQueue()
+        root_h = Heuristics.matching_heuristic(root_state, root_matching, matcher, moves.push_level)
+        if root_h == float('inf'):
+            solving_time = time.time() - start_time
+            return None, 0, solving_time  # Some box can never reach a goal
+        frontier.push(root_h, root_h, (arena.add_root(), root_state, 0, root_matching))
+        min_cost = {root_state: 0}
         n_explored_nodes = 0
 
         while frontier:
-            _, _, current_state = heappop(frontier)
-            g = min_cost[current_state]
+            _, (node_id, current_state, g, matching) = frontier.pop()
+            if g > min_cost[current_state]:
+                continue  # Stale entry: a cheaper path to this state was queued later
             n_explored_nodes += 1
 
             if current_state.is_win():
                 solving_time = time.time() - start_time
-                return current_state.get_path(), n_explored_nodes, solving_time
+                return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
-            for action, action_cost in current_state.get_possible_actions():
-                next_state = current_state.apply_action(action, action_cost)
+            for action, action_cost, next_state in moves.get_successors(current_state):
                 new_cost = g + action_cost
 
                 if new_cost < min_cost.get(next_state, float('inf')):
                     min_cost[next_state] = new_cost
-                    f = new_cost + Heuristics.heuristic1(next_state, distances)
-                    heappush(frontier, (f, next(counter), next_state))
+                    # Only the pushed box's row of the matching changes
+                    next_matching = matching_cache.get(next_state, matcher.get_matching, matching)
+                    h = Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
+                    if h == float('inf'):
+                        continue  # Some box can no longer reach a goal
+                    frontier.push(new_cost + h, h, (arena.add(node_id, action, new_cost), next_state, new_cost, next_matching))
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
+    @staticmethod
+    def anytime_a_star(initial_state: GameState, moves: MoveGenerator = None, on_solution=None,
+                       initial_weight=ARA_INITIAL_WEIGHT, weight_step=ARA_WEIGHT_STEP):
+        """ARA*: weighted A* passes with a falling weight that reuse the open list.
+
+        Every better solution is passed to on_solution(solution, n_explored_nodes, solving_time)
+        as soon as it is found; the best one is returned at the end.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        matcher = BoxGoalMatcher(root_state.level)
+        matching_cache = get_heuristic_cache(root_state.level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+
+        arena = NodeArena()
+        best = {root_state: (0, arena.add_root())}  # state -> (g, node_id)
+        open_states = {root_state: matching_cache.get(root_state, matcher.get_matching)}  # state -> matching
+        closed = set()
+        incons = {}  # Closed states whose g improved during the current pass
+        counter = count()
+        weight = max(initial_weight, 1.0)
+        best_cost = float('inf')
+        best_solution = None
+        n_explored_nodes = 0
+
+        while open_states:
+            # (Re)build the open list with the current weight
+            frontier = []
+            for state, matching in open_states.items():
+                g, _ = best[state]
+                h = Heuristics.matching_heuristic(state, matching, matcher, moves.push_level)
+                if g + h < best_cost:
+                    frontier.append((g + weight * h, next(counter), state, h))
+            heapq.heapify(frontier)
+
+            # --- Improve the incumbent: weighted A* until the best key cannot beat it ---
+            while frontier and frontier[0][0] < best_cost:
+                _, _, current_state, h = heappop(frontier)
+                if current_state not in open_states:
+                    continue  # Stale entry: the state was expanded through a cheaper path
+                matching = open_states.pop(current_state)
+                g, node_id = best[current_state]
+                if g + h >= best_cost:
+                    continue  # Cannot lead to a cheaper solution
+                closed.add(current_state)
+                n_explored_nodes += 1
+
+                if current_state.is_win():
+                    best_cost = g
+                    best_solution = moves.get_solution(initial_state, arena.get_path(node_id))
+                    if on_solution:
+                        on_solution(best_solution, n_explored_nodes, time.time() - start_time)
+                    break
+
+                for action, action_cost, next_state in moves.get_successors(current_state):
+                    new_cost = g + action_cost
+                    if new_cost >= best.get(next_state, (float('inf'),))[0]:
+                        continue
+                    best[next_state] = (new_cost, arena.add(node_id, action, new_cost))
+                    next_matching = matching_cache.get(next_state, matcher.get_matching, matching)
+                    h = Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
+                    if new_cost + h >= best_cost:
+                        continue
+                    if next_state in closed:
+                        incons[next_state] = next_matching
+                    else:
+                        open_states[next_state] = next_matching
+                        heappush(frontier, (new_cost + weight * h, next(counter), next_state, h))
+
+            if weight == 1.0:
+                break  # The last pass was plain A*: the incumbent is optimal
+
+            # --- Next pass: lower the weight, reopen the inconsistent states, forget closed ---
+            weight = max(1.0, weight - weight_step)
+            open_states.update(incons)
+            incons = {}
+            closed = set()
+
+        solving_time = time.time() - start_time
+        return best_solution, n_explored_nodes, solving_time
+
+    @staticmethod
+    def sma_star(initial_state: GameState, moves: MoveGenerator = None,
+                 memory_mb=SMA_MEMORY_MB, max_nodes=None, stats=None):
+        """Simplified memory-bounded A* (SMA*): at most max_nodes nodes in memory.
+
+        When memory is full, the worst leaf (highest f, shallowest) is dropped
+        and its f is backed up into the parent. The parent goes back on the
+        open list with that f, to regenerate only its missing children, and
+        becomes a leaf again once all of them are gone. A child whose state is
+        already in memory at no higher g is left out, but its f (at least the
+        f of the copy in memory) still bounds the parent. The result stays
+        optimal as long as the cheapest solution path fits in the budget; a
+        leaf too deep to get a child in memory is cut.
+
+        If a stats dict is given, it receives max_nodes, n_forgotten (the
+        number of nodes dropped to stay within the budget) and out_of_memory,
+        True if some path was cut. A None result with out_of_memory False
+        means the level has no solution.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+        if max_nodes is None:
+            max_nodes = memory_mb * 1024 * 1024 // SMA_NODE_BYTES
+        max_nodes = max(max_nodes, 64)  # Room for the current path and one expansion
+
+        matcher = BoxGoalMatcher(root_state.level)
+        matching_cache = get_heuristic_cache(root_state.level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+
+        nodes = {}  # node_id -> BoundedNode
+        live = {}  # state -> id of its cheapest node in memory
+        open_nodes = []  # Heap of (f, -depth, tie, node_id): lowest f, deepest first
+        worst_leaves = []  # Heap of (-f, depth, tie, node_id): highest f, shallowest first
+        counter = count()
+        node_ids = count(1)  # 0 is the root
+
+        def get_open_f(node):
+            """f of node on the open list: a leaf, or a node with forgotten children; None otherwise."""
+            if node.children is None:
+                return node.f
+            if node.forgotten_f < float('inf'):
+                return max(node.f, node.forgotten_f)
+            return None
+
+        def add_open(node_id):
+            node = nodes[node_id]
+            f = get_open_f(node)
+            tie = next(counter)
+            if f is not None:
+                heappush(open_nodes, (f, -node.depth, tie, node_id))
+            if not node.children:
+                heappush(worst_leaves, (-get_drop_f(node), node.depth, tie, node_id))
+
+        def get_drop_f(node):
+            """Rank of a node with no child in memory: done nodes hold no work and go first."""
+            return node.f if node.children is None else float('inf')
+
+        def is_open(node_id, f):
+            node = nodes.get(node_id)
+            return node is not None and get_open_f(node) == f
+
+        def is_leaf(node_id, f):
+            node = nodes.get(node_id)
+            return node is not None and not node.children and get_drop_f(node) == f
+
+        def add_child(node_id, action, action_cost, next_state, new_cost, next_f, next_matching):
+            node = nodes[node_id]
+            child_id = next(node_ids)
+            nodes[child_id] = BoundedNode(next_state, new_cost, next_f, node.depth + 1, node_id,
+                                          action, action_cost, next_matching)
+            other_id = live.get(next_state)
+            if other_id is None or nodes[other_id].g > new_cost:
+                live[next_state] = child_id
+            node.children.add(child_id)
+            add_open(child_id)
+
+        def is_on_path(other_id, node):
+            """True if other_id is node or one of its ancestors."""
+            other = nodes[other_id]
+            while node.depth > other.depth:
+                node = nodes[node.parent]
+            return node is other
+
+        def forget(node_id):
+            """Drops a leaf and backs its f up into the parent."""
+            node = nodes.pop(node_id)
+            if live.get(node.state) == node_id:
+                del live[node.state]
+            parent = nodes[node.parent]
+            parent.children.discard(node_id)
+            if node.children is None:
+                parent.forgotten_f = min(parent.forgotten_f, max(node.f, f_floor))
+            else:
+                parent.covered_f = min(parent.covered_f, node.f)  # Done node: the copies go on for it
+            if not parent.children:
+                # Every child is gone: the parent is a leaf again, worth its best forgotten child,
+                # or done as well when only covered children are left
+                if parent.forgotten_f < float('inf') or parent.covered_f == float('inf'):
+                    parent.children = None
+                parent.f = max(parent.f, parent.forgotten_f if parent.children is None else parent.covered_f)
+                parent.forgotten_f = parent.covered_f = float('inf')
+            add_open(node.parent)
+
+        root_matching = matching_cache.get(root_state, matcher.get_matching)
+        root_h = Heuristics.matching_heuristic(root_state, root_matching, matcher, moves.push_level)
+        nodes[0] = BoundedNode(root_state, 0, root_h, 0, None, None, 0, root_matching)
+        live[root_state] = 0
+        add_open(0)
+        n_explored_nodes = 0
+        n_forgotten = 0
+        out_of_memory = False
+        f_floor = 0  # Highest f popped so far: no solution costs less
+
+        while open_nodes:
+            f, _, _, node_id = heappop(open_nodes)
+            if not is_open(node_id, f):
+                continue  # Stale entry
+            if f == float('inf'):
+                break  # Only dead ends are left
+            f = f_floor = max(f, f_floor)
+            node = nodes[node_id]
+            n_explored_nodes += 1
+
+            if node.children is None and node.state.is_win():
+                path = []
+                while node.parent is not None:
+                    path.append((node.action, node.action_cost))
+                    node = nodes[node.parent]
+                solving_time = time.time() - start_time
+                if stats is not None:
+                    stats.update(max_nodes=max_nodes, n_forgotten=n_forgotten, out_of_memory=out_of_memory)
+                return moves.get_solution(initial_state, path[::-1]), n_explored_nodes, solving_time
+
+            if node.depth + 2 > max_nodes:
+                # The path fills the memory: no room for a child, so it is cut here
+                out_of_memory = True
+                node.f = float('inf')
+                add_open(node_id)
+                continue
+
+            # A leaf generates all its children, a node with forgotten ones only the missing children.
+            # Left-out children may be worth less than the forgotten ones: regenerate under the lower bound.
+            if node.children is None:
+                node.children = set()
+                present = set()
+                bound_f = f
+            else:
+                present = {nodes[child_id].state for child_id in node.children}
+                bound_f = max(node.f, min(node.forgotten_f, node.covered_f))
+            node.forgotten_f = node.covered_f = float('inf')
+            covered = []  # (bound, id of the copy in memory, child) for children already in memory
+
+            for action, action_cost, next_state in moves.get_successors(node.state):
+                if next_state in present:
+                    continue
+                new_cost = node.g + action_cost
+                next_matching = matching_cache.get(next_state, matcher.get_matching, node.matching)
+                next_h = Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
+                # Pathmax: a child is never better than the bound it was (re)generated under
+                next_f = max(bound_f, new_cost + next_h)
+                if next_f == float('inf'):
+                    continue
+                child = (action, action_cost, next_state, new_cost, next_f, next_matching)
+                other_id = live.get(next_state)
+                if other_id is not None and nodes[other_id].g <= new_cost:
+                    # Any solution through this child costs at least as much through the copy
+                    covered.append((max(next_f, nodes[other_id].f), other_id, child))
+                    continue
+                add_child(node_id, *child)
+
+            for bound, other_id, child in covered:
+                if not is_on_path(other_id, node):  # Otherwise the child loops back and never helps
+                    node.covered_f = min(node.covered_f, bound)
+
+            if not node.children:
+                if node.covered_f == float('inf'):
+                    node.children = None  # Dead end: stays a leaf with f = inf until it is forgotten
+                node.f = max(bound_f, node.covered_f)
+                node.covered_f = float('inf')
+                # With covered children only, the node is done: the copies go on in its place.
+                # It leaves the open list but keeps that f for its parent if it is forgotten.
+                add_open(node_id)
+
+            spared = []  # The children just generated go last, or the node would come straight back
+            while len(nodes) > max_nodes and (worst_leaves or spared):
+                entry = heappop(worst_leaves) if worst_leaves else spared.pop(0)
+                worst_id = entry[3]
+                if not is_leaf(worst_id, -entry[0]) or worst_id == 0:
+                    continue
+                if worst_leaves and nodes[worst_id].parent == node_id:
+                    spared.append(entry)
+                    continue
+                forget(worst_id)
+                n_forgotten += 1
+            for entry in spared:
+                heappush(worst_leaves, entry)
+
+        solving_time = time.time() - start_time
+        if stats is not None:
+            stats.update(max_nodes=max_nodes, n_forgotten=n_forgotten, out_of_memory=out_of_memory)
+        return None, n_explored_nodes, solving_time
+
     import time
 
     @staticmethod
-    def iddfs(initial_state: GameState, max_depth: int = 100):
+    def iddfs(initial_state: GameState, max_depth: int = 100, moves: MoveGenerator = None):
         start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
         n_explored_nodes = 0
 
         for depth_limit in range(max_depth):
-            stack = [(initial_state, 0)]  # (state, depth)
+            arena = NodeArena()
+            stack = [(arena.add_root(), root_state, 0)]  # (node_id, state, depth)
             visited = set()
 
             while stack:
-                current_state, depth = stack.pop()
+                node_id, current_state, depth = stack.pop()
 
                 if current_state in visited:
                     continue
@@ -255,37 +605,147 @@ class Algorithms:
 
                 if current_state.is_win():
                     solving_time = time.time() - start_time
-                    return current_state.get_path(), n_explored_nodes, solving_time
+                    return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
                 if depth < depth_limit:
-                    for action, action_cost in reversed(current_state.get_possible_actions()):
-                        next_state = current_state.apply_action(action, action_cost)
-                        stack.append((next_state, depth + 1))
+                    for action, action_cost, next_state in reversed(moves.get_successors(current_state)):
+                        stack.append((arena.add(node_id, action, next_state.cost), next_state, depth + 1))
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
-    # Very difficult to solve Sokuban Problem
-    # @staticmethod
-    # def bi_directional(initial_state: GameState):
-    #    pass
+    @staticmethod
+    def bi_directional(initial_state: GameState, moves: MoveGenerator = None):
+        """Bidirectional uniform-cost search over pushes (fewest pushes).
+
+        The forward side pushes from the initial state. The backward side pulls
+        from the solved box configuration, starting once for every player region
+        the last push can leave the player in. Both sides keep the player on the
+        canonical cell of its region, so a box configuration reached from both
+        sides is a meeting point exactly when the player regions match too.
+        The side with the smaller frontier expands its cheapest state; the search
+        stops once the two frontier minimums add up to the best meeting cost.
+        """
+        start_time = time.time()
+
+        if moves is None or not moves.push_level:
+            moves = MoveGenerator(push_level=True)  # Pulls only mirror push-level edges
+        root_state = moves.get_initial_state(initial_state)
+        level = root_state.level
+        if bin(root_state.boxes).count('1') != bin(level.goal_mask).count('1'):
+            # The solved configuration is not unique: only the forward side applies
+            return Algorithms.ucs(initial_state, moves)
+        if root_state.is_win():
+            return [], 1, time.time() - start_time
+
+        # Cells some box can be pushed to from where it starts; a pull onto any
+        # other cell gives a state the forward side can never reach
+        walls = level.walls
+        box_reach = bytearray(level.n_cells)
+        stack = list(iter_cells(root_state.boxes))
+        for cell in stack:
+            box_reach[cell] = 1
+        while stack:
+            cell = stack.pop()
+            for offset in level.offsets.values():
+                next_cell = cell + offset
+                if box_reach[next_cell] or walls[next_cell] or walls[cell - offset]:
+                    continue
+                box_reach[next_cell] = 1
+                stack.append(next_cell)
+
+        arenas = (NodeArena(), NodeArena())  # Forward, backward
+        best = ({}, {})  # Per side: state -> (g, node_id)
+        frontiers = ([], [])  # Per side: heap of (g, tie, state)
+        counter = count()
+
+        best[0][root_state] = (0, arenas[0].add_root())
+        frontiers[0].append((0, next(counter), root_state))
+
+        seen = bytearray(level.n_cells)
+        for cell in range(level.n_cells):
+            if seen[cell] or walls[cell] or (level.goal_mask >> cell) & 1:
+                continue
+            # Scanning cells in order, the first cell of a region is its canonical cell
+            goal_state = GameState(level, cell, level.goal_mask)
+            reachable = goal_state.get_reachable_cells()
+            for reached, is_reachable in enumerate(reachable):
+                seen[reached] |= is_reachable
+            if goal_state.get_possible_pulls(reachable):
+                best[1][goal_state] = (0, arenas[1].add_root())
+                frontiers[1].append((0, next(counter), goal_state))
+
+        meeting = None
+        best_cost = float('inf')
+        n_explored_nodes = 0
+
+        while frontiers[0] and frontiers[1]:
+            if frontiers[0][0][0] + frontiers[1][0][0] >= best_cost:
+                break  # No meeting point left can be cheaper
+
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            g, _, current_state = heappop(frontiers[side])
+            g_best, node_id = best[side][current_state]
+            if g > g_best:
+                continue  # Stale entry
+            n_explored_nodes += 1
+
+            if side == 0:
+                successors = moves.get_successors(current_state)
+            else:
+                successors = [
+                    (pull, pull_cost, current_state.apply_pull(pull, pull_cost))
+                    for pull, pull_cost in current_state.get_possible_pulls()
+                    if box_reach[pull // len(ACTIONS) + level.offsets[ACTIONS[pull % len(ACTIONS)]]]
+                ]
+
+            for action, action_cost, next_state in successors:
+                new_cost = g + action_cost
+                if new_cost >= best[side].get(next_state, (float('inf'),))[0]:
+                    continue
+                best[side][next_state] = (new_cost, arenas[side].add(node_id, action, new_cost))
+                heappush(frontiers[side], (new_cost, next(counter), next_state))
+
+                other = best[1 - side].get(next_state)
+                if other is not None and new_cost + other[0] < best_cost:
+                    best_cost = new_cost + other[0]
+                    meeting = next_state
+
+        solving_time = time.time() - start_time
+        if meeting is None:
+            return None, n_explored_nodes, solving_time
+
+        path = arenas[0].get_path(best[0][meeting][1])
+        # Replay the backward pulls from the meeting point to the goal as pushes
+        for pull, pull_cost in reversed(arenas[1].get_path(best[1][meeting][1])):
+            box, direction = divmod(pull, len(ACTIONS))
+            new_box = box + level.offsets[ACTIONS[direction]]
+            # ACTIONS lists opposite directions in pairs: UP/DOWN, LEFT/RIGHT
+            path.append((new_box * len(ACTIONS) + (direction ^ 1), pull_cost))
+
+        return moves.get_solution(initial_state, path), n_explored_nodes, solving_time
 
     @staticmethod
-    def beam(initial_state: GameState):
+    def beam(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
         beam_width = 100
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        tables = get_level_tables(root_state.level)
+        distances = tables.nearest_push_distances
 
-        counter = count()
-        frontier = [(Heuristics.heuristic1(initial_state, distances), next(counter), initial_state)]
+        arena = NodeArena()
+        # (node_id, state, box term of heuristic2); the box term is passed from parent to child
+        frontier = [(arena.add_root(), root_state, Heuristics.heuristic1(root_state, distances))]
         n_explored_nodes = 0
         visited = set()
 
         while frontier:
-            next_frontier = []
+            children = []
 
-            for _, _, current_state in frontier:
+            for node_id, current_state, box_h in frontier:
                 if current_state in visited:
                     continue
                 visited.add(current_state)
@@ -293,118 +753,238 @@ class Algorithms:
 
                 if current_state.is_win():
                     solving_time = time.time() - start_time
-                    return current_state.get_path(), n_explored_nodes, solving_time
+                    return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
-                for action, action_cost in current_state.get_possible_actions():
-                    next_state = current_state.apply_action(action, action_cost)
+                for action, action_cost, next_state in moves.get_successors(current_state):
                     if next_state in visited:
                         continue
-                    next_frontier.append((
-                        Heuristics.heuristic1(next_state, distances),
-                        next(counter),
-                        next_state
+                    children.append((
+                        arena.add(node_id, action, next_state.cost),
+                        next_state,
+                        Heuristics.heuristic1_delta(current_state, box_h, next_state, distances)
                     ))
 
-            frontier = sorted(next_frontier)[:beam_width]
+            if not children:
+                break
+
+            # heuristic2 = incremental box term + the player term, batched over the whole layer.
+            # The stable sort keeps generation order on ties.
+            states = [state for _, state, _ in children]
+            h_values = np.array([box_h for _, _, box_h in children]) + Heuristics.player_distance_batch(
+                Heuristics.get_box_cell_array(states),
+                np.fromiter((state.player for state in states), dtype=np.int32, count=len(states)),
+                tables
+            )
+            frontier = [children[i] for i in np.argsort(h_values, kind='stable')[:beam_width]]
 
         solving_time = time.time() - start_time
         return None, n_explored_nodes, solving_time
 
     @staticmethod
-    def ida_star(initial_state: GameState):
+    def ida_star(initial_state: GameState, moves: MoveGenerator = None, table_bits=IDA_TABLE_BITS):
+        """IDA*: depth-first passes bounded by f, on an explicit stack.
+
+        Cycles are only checked against the current path, so a state reached
+        again with a lower g is searched again. A fixed-size TranspositionTable
+        keeps the best g per state across iterations and prunes paths that are
+        no cheaper than one already searched. Memory stays at the current path
+        plus the table.
+        """
         start_time = time.time()
 
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
 
-        threshold = Heuristics.heuristic1(initial_state, distances)
+        matcher = BoxGoalMatcher(root_state.level)
+        matching_cache = get_heuristic_cache(root_state.level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+        root_matching = matching_cache.get(root_state, matcher.get_matching)
+
+        table = TranspositionTable(table_bits)
+        threshold = Heuristics.matching_heuristic(root_state, root_matching, matcher, moves.push_level)
+        iteration = 0
         n_explored_nodes = 0
 
-        while True:
-            stack = [(initial_state, 0)]  # (state, g)
-            visited = set()
+        while threshold < float('inf'):
+            iteration += 1
             next_threshold = float('inf')
+            table.store(root_state.key, 0, iteration, 0)
+            # Frame: [state, g, matching, successors (None until expanded), next successor index]
+            stack = [[root_state, 0, root_matching, None, 0]]
+            on_path = {root_state}
+            path = []  # (action, cost) leading to each frame after the root
 
             while stack:
-                current_state, g = stack.pop()
-                f = g + Heuristics.heuristic1(current_state, distances)
+                frame = stack[-1]
+                current_state, g, matching, successors, index = frame
+
+                if successors is None:
+                    n_explored_nodes += 1
+                    if current_state.is_win():
+                        solving_time = time.time() - start_time
+                        return moves.get_solution(initial_state, path), n_explored_nodes, solving_time
+                    successors = frame[3] = moves.get_successors(current_state)
+
+                if index == len(successors):
+                    stack.pop()
+                    on_path.discard(current_state)
+                    if path:
+                        path.pop()
+                    continue
+                frame[4] = index + 1
 
+                action, action_cost, next_state = successors[index]
+                if next_state in on_path:
+                    continue
+                new_cost = g + action_cost
+                if table.is_dominated(next_state.key, new_cost, iteration):
+                    continue
+
+                next_matching = matching_cache.get(next_state, matcher.get_matching, matching)
+                f = new_cost + Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
                 if f > threshold:
                     next_threshold = min(next_threshold, f)
                     continue
 
-                if current_state in visited:
+                table.store(next_state.key, new_cost, iteration, len(stack))
+                stack.append([next_state, new_cost, next_matching, None, 0])
+                on_path.add(next_state)
+                path.append((action, action_cost))
+
+            threshold = next_threshold
+
+        solving_time = time.time() - start_time
+        return None, n_explored_nodes, solving_time
+
+    @staticmethod
+    def fringe_search(initial_state: GameState, moves: MoveGenerator = None):
+        """Fringe search: IDA*'s f thresholds without re-searching from the root.
+
+        The fringe is split into a now list, scanned depth-first, and a later
+        list of the nodes whose f went over the threshold. The later list
+        becomes the next now list, so each pass picks up where the last one
+        stopped. g and the arena node (for the parent) are cached per state; a
+        list entry whose g is above the cached one is stale and skipped.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        matcher = BoxGoalMatcher(root_state.level)
+        matching_cache = get_heuristic_cache(root_state.level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+        root_matching = matching_cache.get(root_state, matcher.get_matching)
+
+        arena = NodeArena()
+        root_h = Heuristics.matching_heuristic(root_state, root_matching, matcher, moves.push_level)
+        cache = {root_state: (0, arena.add_root())}  # state -> (g, node_id)
+        now = [(root_state, 0, root_h, root_matching)]  # (state, g, h, matching); popped from the end
+        later = []
+        threshold = root_h
+        n_explored_nodes = 0
+
+        while now and threshold < float('inf'):
+            next_threshold = float('inf')
+
+            while now:
+                entry = now.pop()
+                current_state, g, h, matching = entry
+                if g > cache[current_state][0]:
+                    continue  # Stale entry: reached again with a lower g
+
+                f = g + h
+                if f > threshold:
+                    next_threshold = min(next_threshold, f)
+                    later.append(entry)
                     continue
-                visited.add(current_state)
-                n_explored_nodes += 1
 
+                n_explored_nodes += 1
+                node_id = cache[current_state][1]
                 if current_state.is_win():
                     solving_time = time.time() - start_time
-                    return current_state.get_path(), n_explored_nodes, solving_time
+                    return moves.get_solution(initial_state, arena.get_path(node_id)), n_explored_nodes, solving_time
 
-                for action, action_cost in reversed(current_state.get_possible_actions()):
-                    next_state = current_state.apply_action(action, action_cost)
-                    if next_state in visited:
+                # Reversed so the first successor is scanned first
+                for action, action_cost, next_state in reversed(moves.get_successors(current_state)):
+                    new_cost = g + action_cost
+                    if new_cost >= cache.get(next_state, (float('inf'),))[0]:
                         continue
-                    stack.append((next_state, g + action_cost))
-
-            if next_threshold == float('inf'):
-                solving_time = time.time() - start_time
-                return None, n_explored_nodes, solving_time
-
+                    next_matching = matching_cache.get(next_state, matcher.get_matching, matching)
+                    next_h = Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
+                    if next_h == float('inf'):
+                        continue  # Some box can no longer reach a goal
+                    cache[next_state] = (new_cost, arena.add(node_id, action, new_cost))
+                    now.append((next_state, new_cost, next_h, next_matching))
+
+            # Keep the fringe order: the node left first is scanned first next pass
+            later.reverse()
+            now, later = later, now
             threshold = next_threshold
 
+        solving_time = time.time() - start_time
+        return None, n_explored_nodes, solving_time
+
     @staticmethod
-    def enforced_hill_climbing(initial_state: GameState):
+    def enforced_hill_climbing(initial_state: GameState, moves: MoveGenerator = None):
         start_time = time.time()
 
-        distances = initial_state.get_mahattan_distances_from_goal_to_all_nodes()
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+
+        tables = get_level_tables(root_state.level)
+        distances = tables.nearest_push_distances
+        heuristic_cache = get_heuristic_cache(root_state.level, "heuristic1")
+        arena = NodeArena()
 
-        def bfs_find_better_state(start_state, current_h):
+        def get_scored_successors(state, h):
+            # Children's values come from the parent's h; only a pushed box changes it
+            return [(Heuristics.heuristic1_delta(state, h, next_state, distances), action, next_state)
+                    for action, action_cost, next_state in moves.get_successors(state)]
+
+        def bfs_find_better_state(start_id, start_state, current_h):
             nonlocal n_explored_nodes
             visited = set()
             queue = deque()
-            queue.append(start_state)
+            queue.append((start_id, start_state, current_h))
             visited.add(start_state)
 
             while queue:
-                state = queue.popleft()
+                node_id, state, state_h = queue.popleft()
                 n_explored_nodes += 1
 
-                for action, action_cost in state.get_possible_actions():
-                    next_state = state.apply_action(action, action_cost)
+                for h, action, next_state in get_scored_successors(state, state_h):
                     if next_state in visited:
                         continue
 
-                    h = Heuristics.heuristic1(next_state, distances)
+                    next_id = arena.add(node_id, action, next_state.cost)
                     if h < current_h:
-                        return next_state
-                    queue.append(next_state)
+                        return next_id, next_state, h
+                    queue.append((next_id, next_state, h))
                     visited.add(next_state)
 
-            return None
+            return None, None, None
 
-        current_state = initial_state
+        current_id = arena.add_root()
+        current_state = root_state
+        current_h = heuristic_cache.get(current_state, Heuristics.heuristic1, distances)
         n_explored_nodes = 0
 
         while True:
-            current_h = Heuristics.heuristic1(current_state, distances)
             n_explored_nodes += 1
 
             if current_state.is_win():
                 solving_time = time.time() - start_time
-                return current_state.get_path(), n_explored_nodes, solving_time
+                return moves.get_solution(initial_state, arena.get_path(current_id)), n_explored_nodes, solving_time
 
-            neighbors = []
-            for action, action_cost in current_state.get_possible_actions():
-                next_state = current_state.apply_action(action, action_cost)
-                neighbors.append((Heuristics.heuristic1(next_state, distances), next_state))
+            neighbors = get_scored_successors(current_state, current_h)
 
-            better_neighbors = [s for h, s in neighbors if h < current_h]
+            better_neighbors = [(h, a, s) for h, a, s in neighbors if h < current_h]
 
             if better_neighbors:
-                current_state = min(better_neighbors, key=lambda s: Heuristics.heuristic1(s, distances))
+                current_h, action, next_state = min(better_neighbors, key=lambda n: n[0])
+                current_id = arena.add(current_id, action, next_state.cost)
+                current_state = next_state
             else:
-                next_state = bfs_find_better_state(current_state, current_h)
+                current_id, next_state, current_h = bfs_find_better_state(current_id, current_state, current_h)
                 if next_state is None:
                     solving_time = time.time() - start_time
                     return None, n_explored_nodes, solving_time
@@ -0,0 +1,54 @@
+class BucketQueue:
+    """Priority queue for small non-negative integer keys (Dial's buckets).
+
+    buckets[f][h] is a stack of items. pop returns an item with the lowest
+    f and, within that f, the lowest h (for A*, the deepest node first).
+    Push and pop are O(1) amortized because the minimum pointers only move
+    forward between pushes below them. Entries are never removed early:
+    the caller checks a popped item against its best known g (lazy
+    deletion).
+    """
+
+    def __init__(self):
+        self.buckets = []  # buckets[f][h] -> list used as a stack
+        self.min_h = []  # Lowest h that may be non-empty in buckets[f]
+        self.min_f = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f, h, item):
+        if f == float('inf') or h == float('inf'):
+            raise ValueError("BucketQueue keys must be finite")
+        buckets = self.buckets
+        while len(buckets) <= f:
+            buckets.append([])
+            self.min_h.append(0)
+        by_h = buckets[f]
+        while len(by_h) <= h:
+            by_h.append([])
+        by_h[h].append(item)
+
+        if h < self.min_h[f]:
+            self.min_h[f] = h
+        if f < self.min_f:
+            self.min_f = f
+        self.size += 1
+
+    def pop(self):
+        """Removes and returns (f, item) with the lowest (f, h); the queue must not be empty."""
+        buckets = self.buckets
+        f = self.min_f
+        while True:
+            by_h = buckets[f]
+            h = self.min_h[f]
+            while h < len(by_h) and not by_h[h]:
+                h += 1
+            self.min_h[f] = h
+            if h < len(by_h):
+                break
+            f += 1
+        self.min_f = f
+        self.size -= 1
+        return f, by_h[h].pop()
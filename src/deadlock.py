@@ -0,0 +1,256 @@
+import time
+from collections import deque
+
+from config import CORRAL_SEARCH_LIMIT
+from src.game_state import GameState
+from src.static_level import ACTIONS
+
+FREEZE_MEMO_LIMIT = 200000
+CORRAL_MEMO_LIMIT = 200000
+
+
+class FreezeDeadlockDetector:
+    """Detects boxes that can never move again after a push (freeze deadlocks).
+
+    A box is frozen when it is blocked on both axes. On one axis it is blocked
+    by a wall on either side, by dead squares on both sides, or by a
+    neighbouring box that is itself blocked on the other axis. Boxes already
+    under examination count as walls, which stops the recursion. A push is a
+    deadlock when it freezes a group of boxes that are not all on goals.
+    """
+
+    def __init__(self, level):
+        self.level = level
+        self.memo = {}
+
+        # Counters used to weigh how much the check prunes against what it costs
+        self.n_checks = 0
+        self.n_memo_hits = 0
+        self.n_deadlocks = 0
+        self.time_spent = 0.0
+
+    def is_deadlock(self, boxes, box_cell):
+        """Returns True if the box just pushed onto box_cell is frozen off-goal with its neighbours."""
+        start_time = time.perf_counter()
+        self.n_checks += 1
+
+        memo_key = (box_cell, boxes)
+        is_dead = self.memo.get(memo_key)
+        if is_dead is None:
+            frozen = set()
+            is_dead = self._is_blocked(boxes, box_cell, 0, frozen, set()) and \
+                self._is_blocked(boxes, box_cell, 1, frozen, set()) and \
+                any(not self.level.is_goal_cell(cell) for cell in frozen | {box_cell})
+            if len(self.memo) >= FREEZE_MEMO_LIMIT:
+                self.memo.clear()
+            self.memo[memo_key] = is_dead
+        else:
+            self.n_memo_hits += 1
+
+        if is_dead:
+            self.n_deadlocks += 1
+        self.time_spent += time.perf_counter() - start_time
+        return is_dead
+
+    def _is_blocked(self, boxes, cell, axis, frozen, as_walls):
+        """Checks whether the box on cell can never move along axis (0 = horizontal, 1 = vertical)."""
+        level = self.level
+        walls = level.walls
+        offset = 1 if axis == 0 else level.width
+        before, after = cell - offset, cell + offset
+
+        if walls[before] or walls[after]:
+            return True
+        if level.dead_squares[before] and level.dead_squares[after]:
+            return True
+
+        as_walls.add(cell)
+        if before in as_walls or after in as_walls:
+            return True
+
+        for neighbour in (before, after):
+            if (boxes >> neighbour) & 1 and self._is_blocked(boxes, neighbour, 1 - axis, frozen, as_walls):
+                frozen.add(neighbour)
+                return True
+
+        return False
+
+
+class CorralPruner:
+    """Corral analysis on top of the player-reachability flood fill.
+
+    A corral is an area of floor the player cannot reach, fenced off by walls
+    and boxes. It is an I-corral when every legal push of a barrier box goes
+    into the corral. It is a PI-corral when, in addition, the player can push
+    every barrier box into it right now. If a PI-corral still needs work (a
+    box off-goal or an empty goal inside), every solution has to push one of
+    its barrier boxes inward at some point. Only those pushes are therefore
+    kept. Before that, a bounded push search over the corral's boxes alone
+    tries to prove that the corral can never be opened or solved. If it
+    succeeds, the whole state is a deadlock, and the proof is handed to the
+    pattern store when there is one.
+    """
+
+    def __init__(self, level, player, search_limit=CORRAL_SEARCH_LIMIT, pattern_store=None):
+        self.level = level
+        self.search_limit = search_limit
+        self.pattern_store = pattern_store
+        self.memo = {}
+        self.deadlock_memo = {}
+
+        # Floor cells inside the level (walkable from the start when boxes are ignored)
+        walls = level.walls
+        offsets = tuple(level.offsets.values())
+        inside = bytearray(level.n_cells)
+        inside[player] = 1
+        stack = [player]
+        while stack:
+            cell = stack.pop()
+            for offset in offsets:
+                next_cell = cell + offset
+                if not inside[next_cell] and not walls[next_cell]:
+                    inside[next_cell] = 1
+                    stack.append(next_cell)
+        self.inside = bytes(inside)
+
+        self.n_analysed = 0
+        self.n_restricted = 0
+        self.n_deadlocks = 0
+        self.time_spent = 0.0
+
+    def get_allowed_pushes(self, state, reachable):
+        """Returns None (no restriction), an empty set (deadlock) or the encoded pushes worth trying."""
+        start_time = time.perf_counter()
+        self.n_analysed += 1
+
+        memo_key = (state.boxes, reachable.index(1))
+        allowed = self.memo.get(memo_key, False)
+        if allowed is False:
+            allowed = self._analyse(state, reachable)
+            if len(self.memo) >= CORRAL_MEMO_LIMIT:
+                self.memo.clear()
+            self.memo[memo_key] = allowed
+
+        if allowed is not None:
+            if allowed:
+                self.n_restricted += 1
+            else:
+                self.n_deadlocks += 1
+        self.time_spent += time.perf_counter() - start_time
+        return allowed
+
+    def _analyse(self, state, reachable):
+        level = self.level
+        walls = level.walls
+        goal_mask = level.goal_mask
+        inside = self.inside
+        boxes = state.boxes
+        n_directions = len(ACTIONS)
+        offsets = [level.offsets[action] for action in ACTIONS]
+
+        labels = {}
+        best = None
+        for start in range(level.n_cells):
+            if not inside[start] or reachable[start] or start in labels or (boxes >> start) & 1:
+                continue
+
+            # Flood-fill one corral and collect the boxes fencing it
+            area = [start]
+            labels[start] = start
+            fence = set()
+            for cell in area:
+                for offset in offsets:
+                    next_cell = cell + offset
+                    if walls[next_cell] or next_cell in labels:
+                        continue
+                    if (boxes >> next_cell) & 1:
+                        fence.add(next_cell)
+                        continue
+                    labels[next_cell] = start
+                    area.append(next_cell)
+
+            area_mask = 0
+            for cell in area:
+                area_mask |= 1 << cell
+            fence_mask = 0
+            for cell in fence:
+                fence_mask |= 1 << cell
+
+            # Nothing to do in a corral whose boxes and goals are all settled
+            if fence_mask & ~goal_mask == 0 and area_mask & goal_mask == 0:
+                continue
+
+            pushes = self._get_pi_corral_pushes(state, reachable, fence, area_mask, offsets, n_directions)
+            if pushes is None:
+                continue
+
+            if self._is_corral_deadlock(state, fence_mask, area):
+                return frozenset()
+            if best is None or len(pushes) < len(best):
+                best = pushes
+
+        return best
+
+    def _get_pi_corral_pushes(self, state, reachable, fence, area_mask, offsets, n_directions):
+        """Returns the inward pushes of a PI-corral's barrier, or None if it is not a PI-corral."""
+        walls = self.level.walls
+        dead_squares = self.level.dead_squares
+        boxes = state.boxes
+        pushes = []
+
+        for box in fence:
+            can_push_inward = False
+            for direction, offset in enumerate(offsets):
+                if not reachable[box - offset]:
+                    continue
+                new_box = box + offset
+                if walls[new_box] or dead_squares[new_box] or (boxes >> new_box) & 1:
+                    continue
+                if not (area_mask >> new_box) & 1:
+                    return None  # A legal push leaves the corral: not an I-corral
+                can_push_inward = True
+                pushes.append(box * n_directions + direction)
+
+            # Every barrier box must be pushable into the corral right now. A box the
+            # player cannot touch may still be moved from inside another corral.
+            if not can_push_inward:
+                return None
+
+        return frozenset(pushes)
+
+    def _is_corral_deadlock(self, state, fence_mask, area):
+        """Bounded push search over the corral's boxes alone; True only if it provably cannot open."""
+        sub_state = GameState(self.level, state.player, fence_mask).normalized()
+        memo_key = (fence_mask, sub_state.player, area[0])
+        is_dead = self.deadlock_memo.get(memo_key)
+        if is_dead is not None:
+            return is_dead
+
+        is_dead = True
+        visited = {sub_state}
+        q = deque([sub_state])
+        while q:
+            current = q.popleft()
+            if current.is_win():
+                is_dead = False
+                break
+
+            reachable = current.get_reachable_cells()
+            if any(reachable[cell] for cell in area):
+                is_dead = False  # The player got into the corral, so it can be opened
+                break
+
+            if len(visited) > self.search_limit:
+                is_dead = False  # Gave up: not proven
+                break
+
+            for push, push_cost in current.get_possible_pushes(reachable):
+                next_state = current.apply_push(push, push_cost)
+                if next_state not in visited:
+                    visited.add(next_state)
+                    q.append(next_state)
+
+        if is_dead and self.pattern_store:
+            self.pattern_store.learn(fence_mask, sub_state.get_reachable_cells())
+        self.deadlock_memo[memo_key] = is_dead
+        return is_dead
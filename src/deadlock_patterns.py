@@ -0,0 +1,224 @@
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so the patterns stay in this process
+    fcntl = None
+
+from config import DEADLOCK_PATTERN_DIR, DEADLOCK_PATTERN_SLOTS
+from src.static_level import iter_cells
+
+PATTERN_RADIUS = 2  # 5x5 window around the anchor box
+PATTERN_WIDTH = 2 * PATTERN_RADIUS + 1
+
+FILE_MAGIC = b'SOKODLP1'
+HEADER = struct.Struct('<8sII')  # magic, n_slots, n_patterns
+SLOT = struct.Struct('<QI4x')  # window key (0 = empty), player region bits
+SLOT_KEY = struct.Struct('<Q')
+SLOT_REGION = struct.Struct('<I')
+MAX_LOAD = 0.75
+
+
+class DeadlockPatternStore:
+    """Per-level table of proven deadlock patterns, kept in a memory-mapped file.
+
+    A pattern is a set of boxes B that cannot all be solved from one player
+    region, as proven by the corral sub-search. Extra boxes only get in the
+    way, so any state holding B with the player in that region is dead.
+
+    Patterns are stored once per box of B whose 5x5 window covers all of B.
+    The key is the anchor cell plus the window's box bits. The value holds
+    the window cells of the player's region. A lookup is an exact probe of the
+    window around each off-goal box. It matches when the player's reachable
+    cells overlap the stored region. Walls are not part of the key because
+    the file already belongs to one level layout.
+
+    The table is open-addressed with linear probing. It lives in a shared
+    mapping, so other processes solving the same level see new patterns right
+    away, and later runs load them back from disk. Creating the file and
+    writing a slot hold an flock on it; lookups take no lock, since a slot's
+    region is written before the key that makes it visible.
+    """
+
+    def __init__(self, level, directory=DEADLOCK_PATTERN_DIR, n_slots=DEADLOCK_PATTERN_SLOTS):
+        self.level = level
+        self.n_slots = n_slots
+        self.slot_bits = n_slots.bit_length() - 1
+        self.window = self._window_cells(level)
+        self.buffer, self.fd = self._open(level, directory, n_slots)
+
+        self.n_lookups = 0
+        self.n_hits = 0
+        self.n_learned = 0
+        self.time_spent = 0.0
+
+    @staticmethod
+    def _window_cells(level):
+        """Offsets of the window cells relative to the anchor, in bit order."""
+        return tuple(dr * level.width + dc
+                     for dr in range(-PATTERN_RADIUS, PATTERN_RADIUS + 1)
+                     for dc in range(-PATTERN_RADIUS, PATTERN_RADIUS + 1))
+
+    def _open(self, level, directory, n_slots):
+        """Maps the level's pattern file; returns (buffer, fd), fd being None for an in-memory table.
+
+        The file is only initialised under its lock while it is still empty,
+        so no other process can have it mapped. A file of the wrong size or
+        format is never truncated, as another process may be using it.
+        """
+        size = HEADER.size + n_slots * SLOT.size
+        if fcntl is None:
+            return self._init_buffer(mmap.mmap(-1, size), n_slots), None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{level.layout_hash()}.dlp")
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_size == 0:
+                    os.ftruncate(fd, size)
+                    buffer = self._init_buffer(mmap.mmap(fd, size), n_slots)
+                elif self._is_valid(fd, size, n_slots):
+                    buffer = mmap.mmap(fd, size)
+                else:
+                    buffer = None
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            except OSError:
+                os.close(fd)
+                raise
+            if buffer is None:
+                os.close(fd)
+                buffer, fd = self._replace_stale(path, size, n_slots)
+        except OSError as e:
+            print(f"Warning: deadlock patterns kept in memory only ({e})")
+            return self._init_buffer(mmap.mmap(-1, size), n_slots), None
+        return buffer, fd
+
+    @staticmethod
+    def _is_valid(fd, size, n_slots):
+        if os.fstat(fd).st_size != size:
+            return False
+        magic, stored_slots, _ = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+        return magic == FILE_MAGIC and stored_slots == n_slots
+
+    def _replace_stale(self, path, size, n_slots):
+        """Builds a fresh file next to path and renames it over the stale one.
+
+        Processes that mapped the stale file keep its inode, so their mappings
+        stay valid. Nobody can open the new file before it is initialised.
+        """
+        fd, new_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            os.ftruncate(fd, size)
+            buffer = self._init_buffer(mmap.mmap(fd, size), n_slots)
+            os.replace(new_path, path)
+        except OSError:
+            os.close(fd)
+            if os.path.exists(new_path):
+                os.remove(new_path)
+            raise
+        return buffer, fd
+
+    @staticmethod
+    def _init_buffer(buffer, n_slots):
+        HEADER.pack_into(buffer, 0, FILE_MAGIC, n_slots, 0)
+        return buffer
+
+    def get_n_patterns(self):
+        return HEADER.unpack_from(self.buffer, 0)[2]
+
+    def _window_key(self, anchor, mask):
+        """Key of the window around anchor: anchor cell above the window bits of mask."""
+        n_cells = self.level.n_cells
+        bits = 0
+        for i, offset in enumerate(self.window):
+            cell = anchor + offset
+            if 0 <= cell < n_cells and (mask >> cell) & 1:
+                bits |= 1 << i
+        return (anchor << (PATTERN_WIDTH * PATTERN_WIDTH)) | bits
+
+    def _window_region(self, anchor, reachable):
+        n_cells = self.level.n_cells
+        bits = 0
+        for i, offset in enumerate(self.window):
+            cell = anchor + offset
+            if 0 <= cell < n_cells and reachable[cell]:
+                bits |= 1 << i
+        return bits
+
+    def _home_slot(self, key):
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.slot_bits)
+
+    def _probe(self, key):
+        """Yields the region of every entry stored for key."""
+        slot = self._home_slot(key)
+        for _ in range(self.n_slots):
+            stored_key, region = SLOT.unpack_from(self.buffer, HEADER.size + slot * SLOT.size)
+            if stored_key == 0:
+                return
+            if stored_key == key:
+                yield region
+            slot = (slot + 1) & (self.n_slots - 1)
+
+    def is_deadlock(self, boxes, reachable):
+        """Returns True if the boxes around some off-goal box match a learned pattern."""
+        start_time = time.perf_counter()
+        self.n_lookups += 1
+
+        is_dead = False
+        if not self.get_n_patterns():
+            self.time_spent += time.perf_counter() - start_time
+            return is_dead
+
+        for box in iter_cells(boxes & ~self.level.goal_mask):
+            regions = list(self._probe(self._window_key(box, boxes)))
+            if regions:
+                player_region = self._window_region(box, reachable)
+                if any(region & player_region for region in regions):
+                    is_dead = True
+                    break
+
+        if is_dead:
+            self.n_hits += 1
+        self.time_spent += time.perf_counter() - start_time
+        return is_dead
+
+    def learn(self, boxes, reachable):
+        """Stores boxes as dead for the player region in reachable, flood-filled with only these boxes."""
+        n_boxes = bin(boxes).count('1')
+        window_mask = (1 << (PATTERN_WIDTH * PATTERN_WIDTH)) - 1
+        for anchor in iter_cells(boxes & ~self.level.goal_mask):
+            key = self._window_key(anchor, boxes)
+            if bin(key & window_mask).count('1') != n_boxes:
+                continue  # Part of the pattern falls outside this anchor's window
+            region = self._window_region(anchor, reachable)
+            if region:
+                self._insert(key, region)
+
+    def _insert(self, key, region):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)  # One writer at a time across processes
+        try:
+            n_patterns = self.get_n_patterns()
+            if n_patterns >= self.n_slots * MAX_LOAD:
+                return
+            if region in self._probe(key):
+                return
+
+            slot = self._home_slot(key)
+            while SLOT.unpack_from(self.buffer, HEADER.size + slot * SLOT.size)[0] != 0:
+                slot = (slot + 1) & (self.n_slots - 1)
+
+            # Region first: a reader that sees the key also sees its region
+            offset = HEADER.size + slot * SLOT.size
+            SLOT_REGION.pack_into(self.buffer, offset + SLOT_KEY.size, region)
+            SLOT_KEY.pack_into(self.buffer, offset, key)
+            HEADER.pack_into(self.buffer, 0, FILE_MAGIC, self.n_slots, n_patterns + 1)
+            self.n_learned += 1
+        finally:
+            if self.fd is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -0,0 +1,187 @@
+import heapq
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from itertools import count
+
+from config import EXTERNAL_BFS_DIR, EXTERNAL_BFS_MEMORY_MB
+from src.game_state import GameState
+from src.move_generator import MoveGenerator
+from src.parallel_search import encode_state, decode_state
+
+RECORD_OVERHEAD = 48  # Bytes a record costs in the sort buffer on top of its own width
+MERGE_FAN_IN = 64  # Most run files merged (and kept open) at once
+
+
+def read_records(path, record_size):
+    """Yields the fixed-width records of a file, read through mmap."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in range(0, len(mm), record_size):
+            yield mm[offset:offset + record_size]
+
+
+def unique(records):
+    """Drops repeats from a sorted stream of records."""
+    last = None
+    for record in records:
+        if record != last:
+            yield record
+            last = record
+
+
+def merge_runs(run_paths, record_size, new_path):
+    """Merges groups of sorted runs until at most MERGE_FAN_IN are left; returns the remaining paths."""
+    while len(run_paths) > MERGE_FAN_IN:
+        merged_paths = []
+        for i in range(0, len(run_paths), MERGE_FAN_IN):
+            group = run_paths[i:i + MERGE_FAN_IN]
+            merged_path = new_path()
+            with open(merged_path, 'wb') as f:
+                f.writelines(unique(heapq.merge(*(read_records(path, record_size) for path in group))))
+            for path in group:
+                os.remove(path)
+            merged_paths.append(merged_path)
+        run_paths = merged_paths
+    return run_paths
+
+
+def remove_stale_dirs(scratch_dir):
+    """Deletes the work directories of runs whose process is gone (e.g. terminated on timeout)."""
+    for name in os.listdir(scratch_dir):
+        try:
+            pid = int(name.split('_')[1])
+            os.kill(pid, 0)
+        except (IndexError, ValueError):
+            continue  # Not a work directory
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(scratch_dir, name), ignore_errors=True)
+        except PermissionError:
+            pass  # Alive, owned by someone else
+
+
+class ExternalSearch:
+    """Searches that keep their layers on disk instead of in sets and queues."""
+
+    @staticmethod
+    def external_bfs(initial_state: GameState, moves: MoveGenerator = None,
+                     scratch_dir=EXTERNAL_BFS_DIR, memory_mb=EXTERNAL_BFS_MEMORY_MB):
+        """BFS with delayed duplicate detection; memory stays bounded by memory_mb.
+
+        Every layer is a file of fixed-width state records, sorted and free of
+        states from earlier layers. The children of a layer are sorted in runs
+        that fit the memory budget. The runs are merged with the sorted file of
+        all visited states in one streaming pass, which writes the next layer
+        and the new visited file. The path is rebuilt by scanning each layer
+        backwards for a parent of the state found.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+        level = root_state.level
+        record_size = 2 * (1 + bin(root_state.boxes).count('1'))
+        run_capacity = max(1, memory_mb * 1024 * 1024 // (record_size + RECORD_OVERHEAD))
+
+        os.makedirs(scratch_dir, exist_ok=True)
+        remove_stale_dirs(scratch_dir)
+        work_dir = tempfile.mkdtemp(prefix=f"bfs_{os.getpid()}_", dir=scratch_dir)
+        run_names = count()
+
+        def get_path(name):
+            return os.path.join(work_dir, name)
+
+        def new_run_path():
+            return get_path(f"run_{next(run_names)}.bin")
+
+        def get_successors(record):
+            return moves.get_successors(decode_state(level, memoryview(record).cast('H')))
+
+        try:
+            with open(get_path("layer_0.bin"), 'wb') as f:
+                f.write(encode_state(root_state))
+            shutil.copyfile(get_path("layer_0.bin"), get_path("visited.bin"))
+
+            depth = 0
+            goal_record = encode_state(root_state) if root_state.is_win() else None
+            n_explored_nodes = 0
+
+            while goal_record is None:
+                # --- Expand the layer into sorted runs that fit in memory ---
+                run_paths = []
+                buffer = []
+                goal_records = set()
+
+                def write_run():
+                    run_path = new_run_path()
+                    with open(run_path, 'wb') as run_file:
+                        run_file.writelines(unique(sorted(buffer)))
+                    run_paths.append(run_path)
+                    buffer.clear()
+
+                for record in read_records(get_path(f"layer_{depth}.bin"), record_size):
+                    n_explored_nodes += 1
+                    for _, _, next_state in get_successors(record):
+                        next_record = encode_state(next_state)
+                        buffer.append(next_record)
+                        if next_state.is_win():
+                            goal_records.add(next_record)
+                        if len(buffer) >= run_capacity:
+                            write_run()
+                if buffer:
+                    write_run()
+
+                # --- Merge the runs against the visited states: new ones form the next layer ---
+                n_new = 0
+                run_paths = merge_runs(run_paths, record_size, new_run_path)
+                children = unique(heapq.merge(*(read_records(run_path, record_size) for run_path in run_paths)))
+                visited = read_records(get_path("visited.bin"), record_size)
+                with open(get_path(f"layer_{depth + 1}.bin"), 'wb') as layer_file, \
+                        open(get_path("visited_next.bin"), 'wb') as visited_file:
+                    seen = next(visited, None)
+                    for record in children:
+                        while seen is not None and seen < record:
+                            visited_file.write(seen)
+                            seen = next(visited, None)
+                        if record == seen:
+                            continue
+                        visited_file.write(record)
+                        layer_file.write(record)
+                        n_new += 1
+                        if goal_record is None and record in goal_records:
+                            goal_record = record
+                    while seen is not None:
+                        visited_file.write(seen)
+                        seen = next(visited, None)
+
+                os.replace(get_path("visited_next.bin"), get_path("visited.bin"))
+                for run_path in run_paths:
+                    os.remove(run_path)
+                depth += 1
+
+                if n_new == 0:
+                    solving_time = time.time() - start_time
+                    return None, n_explored_nodes, solving_time  # Every reachable state has been seen
+
+            # --- Rebuild the path: find a parent of the target in each earlier layer ---
+            path = []
+            target = goal_record
+            for parent_depth in range(depth - 1, -1, -1):
+                found = False
+                for record in read_records(get_path(f"layer_{parent_depth}.bin"), record_size):
+                    for action, action_cost, next_state in get_successors(record):
+                        if encode_state(next_state) == target:
+                            path.append((action, action_cost))
+                            target = record
+                            found = True
+                            break
+                    if found:
+                        break
+
+            solving_time = time.time() - start_time
+            return moves.get_solution(initial_state, path[::-1]), n_explored_nodes, solving_time
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
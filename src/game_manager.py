@@ -1,8 +1,10 @@
-from config import MAP_DIR, PROBLEM_SOLVING_TIME
+from config import MAP_DIR, PROBLEM_SOLVING_TIME, PORTFOLIO_ALGORITHMS
 import os
 from src.game_state import GameState
 from src.map_loader import load_map
 from src.algorithms import Algorithms
+from src.parallel_search import ParallelSearch
+from src.external_search import ExternalSearch
 import time
 import re
 from multiprocessing import Process, Queue
@@ -11,9 +13,15 @@ from src.algorithm_generator import AlgorithmGenerator
 
 # === Thêm vào đầu file game_manager.py hoặc một file riêng ===
 
-def run_algorithm(algo_func, state, output_queue):
-    solution, n_explored_node, solving_time = algo_func(state)
-    output_queue.put((solution, n_explored_node, solving_time))
+def run_algorithm(algo_func, state, output_queue, stream=False, algo_name=None):
+    # Messages are (algo_name, solution, n_explored_node, solving_time, is_final). Anytime
+    # algorithms (stream=True) also send every improved solution as it is found.
+    kwargs = {}
+    if stream:
+        kwargs["on_solution"] = lambda solution, n_explored_node, solving_time: \
+            output_queue.put((algo_name, solution, n_explored_node, solving_time, False))
+    solution, n_explored_node, solving_time = algo_func(state, **kwargs)
+    output_queue.put((algo_name, solution, n_explored_node, solving_time, True))
 
 # handle game logic and algorithms for solving Sokoban puzzles
 class GameManager:
@@ -28,12 +36,21 @@ class GameManager:
         "UCS": Algorithms.ucs,
         "A*": Algorithms.a_star,
         "IDDFS": Algorithms.iddfs,
-        # "BI-DIRECTIONAL": Algorithms.bi_directional,
         "BEAM": Algorithms.beam,
         "IDA*": Algorithms.ida_star,
         "EHC": Algorithms.enforced_hill_climbing,
+        "ARA*": Algorithms.anytime_a_star,
+        "BIDIR": Algorithms.bi_directional,
+        "HDA*": ParallelSearch.hda_star,
+        "PAR-BFS": ParallelSearch.parallel_bfs,
+        "EXT-BFS": ExternalSearch.external_bfs,
+        "SMA*": Algorithms.sma_star,
+        "FRINGE": Algorithms.fringe_search,
     }
 
+    # Algorithms that stream improving solutions before they finish
+    anytime_algorithms = {"ARA*"}
+
     algorithm_generators = {
         "DFS": AlgorithmGenerator.dfs_generator,
         "BFS": AlgorithmGenerator.bfs_generator,
@@ -44,9 +61,13 @@ class GameManager:
         "BEAM": AlgorithmGenerator.beam_generator,
         "IDA*": AlgorithmGenerator.ida_star_generator,
         "EHC": AlgorithmGenerator.enforced_hill_climbing_generator,
+        "FRINGE": AlgorithmGenerator.fringe_search_generator,
     }
 
-    available_algo_names = list(algorithms.keys())
+    # Races the PORTFOLIO_ALGORITHMS in parallel processes; the first solution wins
+    PORTFOLIO = "PORTFOLIO"
+
+    available_algo_names = list(algorithms.keys()) + [PORTFOLIO]
     selected_map_idx = 0
     selected_algo_idx = 0
 
@@ -62,9 +83,11 @@ class GameManager:
 
     status_message = ""
 
-    _algo_process = None
+    _algo_processes = {} # algo_name -> Process still solving
+    _is_portfolio = False
     _algo_output_queue = None
     _start_time = None
+    _best_result = None # Best (solution, n_explored_node) streamed so far by an anytime algorithm
 
     search_generator = None
 
@@ -105,6 +128,7 @@ class GameManager:
         if algo_name not in GameManager.available_algo_names:
             raise ValueError(f"Algorithm '{algo_name}' is not defined.")
 
+        GameManager.stop_algorithm()
         GameManager.actions = None
         GameManager.solution_rendering_step = 0
         GameManager.n_explored_nodes = 0
@@ -113,43 +137,75 @@ class GameManager:
         GameManager.current_state = GameManager.initial_state
         temp_state = GameManager.initial_state
 
+        algo_names = PORTFOLIO_ALGORITHMS if algo_name == GameManager.PORTFOLIO else [algo_name]
+
         GameManager.status_message = "Solving..."
         GameManager._start_time = time.time()
+        GameManager._best_result = None
+        GameManager._is_portfolio = algo_name == GameManager.PORTFOLIO
+        # One queue shared by all the solvers; every message carries its solver's name
         GameManager._algo_output_queue = Queue()
-        GameManager._algo_process = Process(
-            target=run_algorithm,
-            args=(GameManager.algorithms[algo_name], temp_state, GameManager._algo_output_queue)
-        )
-        GameManager._algo_process.start()
+        for name in algo_names:
+            process = Process(
+                target=run_algorithm,
+                args=(GameManager.algorithms[name], temp_state, GameManager._algo_output_queue,
+                      name in GameManager.anytime_algorithms, name)
+            )
+            process.start()
+            GameManager._algo_processes[name] = process
+
+    @staticmethod
+    def stop_algorithm():
+        """Terminates every solver process that is still running and waits for it to exit."""
+        for process in GameManager._algo_processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        GameManager._algo_processes = {}
+        GameManager._best_result = None
 
     @staticmethod
     def update_algorithm():
-        if GameManager._algo_process is None:
+        if not GameManager._algo_processes:
             return
 
         current_time = time.time()
-        if current_time - GameManager._start_time >= PROBLEM_SOLVING_TIME:
-            if GameManager._algo_process.is_alive():
-                GameManager._algo_process.terminate()
-            GameManager.status_message = f"Timeout. No solution found after {PROBLEM_SOLVING_TIME} s."
-            GameManager.actions = None
-            GameManager._algo_process = None
-            return
 
-        if not GameManager._algo_output_queue.empty():
-            solution, n_explored_node, solving_time = GameManager._algo_output_queue.get()
+        while not GameManager._algo_output_queue.empty():
+            algo_name, solution, n_explored_node, solving_time, is_final = GameManager._algo_output_queue.get()
             solving_time = int((current_time - GameManager._start_time) * 1000) # Comment this line if you want to use the solving_time from the algorithm
             GameManager.solving_time = solving_time
             GameManager.n_explored_nodes = n_explored_node
 
+            if not is_final:
+                # Keep the improved plan and let the search go on
+                GameManager._best_result = (solution, n_explored_node)
+                GameManager.status_message = f"Improving... best cost {sum(cost for _, cost in solution)}"
+                continue
+
+            GameManager._algo_processes.pop(algo_name).join()
             if solution is None:
+                if GameManager._algo_processes:
+                    continue # Other solvers of the portfolio are still racing
                 GameManager.status_message = "No solution found."
                 GameManager.actions = None
             else:
-                GameManager.status_message = f""
+                GameManager.status_message = f"Solved by {algo_name}" if GameManager._is_portfolio else f""
                 GameManager.actions = iter(solution)
 
-            GameManager._algo_process = None
+            GameManager.stop_algorithm()
+            return
+
+        if current_time - GameManager._start_time >= PROBLEM_SOLVING_TIME:
+            best_result = GameManager._best_result
+            GameManager.stop_algorithm()
+            if best_result is not None:
+                solution, n_explored_node = best_result
+                GameManager.status_message = f"Timeout. Best solution so far (cost {sum(cost for _, cost in solution)})."
+                GameManager.actions = iter(solution)
+            else:
+                GameManager.status_message = f"Timeout. No solution found after {PROBLEM_SOLVING_TIME} s."
+                GameManager.actions = None
 
     @staticmethod
     def start_visualization(algo_name):
@@ -1,79 +1,91 @@
-class GameState:
-    def __init__(self, player_pos, box_positions, wall_positions, goal_positions,
-                 map_dims, parent=None, previous_action=None, cost=0, depth=0):
-        self.player_pos = tuple(player_pos)
+from collections import deque
+
+from src.static_level import ACTIONS, iter_cells
+
 
-        self.box_positions = frozenset(map(tuple, box_positions))
-        self.wall_positions = wall_positions
-        self.goal_positions = goal_positions
-        self.map_dims = map_dims # (rows, cols)
+WALK_COST = 1
+PUSH_COST = 2
 
-        self.parent = parent
-        self.previous_action = previous_action # The action that led to this state
+
+class GameState:
+    # Compact search node: walls, goals and dims live on the shared StaticLevel,
+    # the player is a cell index and the boxes are an int bitmask over cells.
+    # The search tree itself lives in a NodeArena, so states keep no parent link.
+    __slots__ = ('level', 'player', 'boxes', 'key', 'cost')
+
+    def __init__(self, level, player, boxes, cost=0, key=None):
+        self.level = level
+        self.player = player
+        self.boxes = boxes
+        # Zobrist key, kept up to date incrementally by apply_action
+        self.key = level.zobrist_key(player, boxes) if key is None else key
         self.cost = cost # Cost from initial state to current state
-        self.depth = depth   # Depth of this node in the search tree
+
+    @property
+    def player_pos(self):
+        return self.level.to_pos(self.player)
+
+    @property
+    def box_positions(self):
+        return self.level.to_positions(self.boxes)
+
+    @property
+    def wall_positions(self):
+        return self.level.wall_positions
+
+    @property
+    def goal_positions(self):
+        return self.level.goal_positions
+
+    @property
+    def map_dims(self):
+        return self.level.map_dims # (rows, cols)
+
+    def box_cells(self):
+        return iter_cells(self.boxes)
 
     def is_wall(self, pos):
-        return pos in self.wall_positions
+        return pos in self.level.wall_positions
 
     def is_box(self, pos):
-        return pos in self.box_positions
+        return (self.boxes >> self.level.to_cell(pos)) & 1 == 1
 
     def is_goal(self, pos):
-        return pos in self.goal_positions
+        return pos in self.level.goal_positions
 
     def is_win(self):
-        if not self.box_positions: # No boxes means no win (or trivial map)
+        if not self.boxes: # No boxes means no win (or trivial map)
             return False
-        return all(box_pos in self.goal_positions for box_pos in self.box_positions)
-
-    def is_deadlock_at(self, box_pos):
-        if box_pos in self.goal_positions:
-            return False  # Trên goal thì không coi là deadlock
-
-        r, c = box_pos
-
-        walls = {
-            'up': self.is_wall((r - 1, c)),
-            'down': self.is_wall((r + 1, c)),
-            'left': self.is_wall((r, c - 1)),
-            'right': self.is_wall((r, c + 1)),
-        }
-
-        # Check xem box bị đẩy vào góc
-        is_corner = (
-                (walls['up'] and walls['left']) or
-                (walls['up'] and walls['right']) or
-                (walls['down'] and walls['left']) or
-                (walls['down'] and walls['right'])
-        )
+        return self.boxes & ~self.level.goal_mask == 0
 
-        return is_corner
+    def is_deadlock_at(self, box_cell):
+        # Dead squares are precomputed per level and already exclude goals
+        return self.level.dead_squares[box_cell] == 1
 
     def get_possible_actions(self):
         actions = []
-        possible_moves = {
-            'UP': (-1, 0), 'DOWN': (1, 0),
-            'LEFT': (0, -1), 'RIGHT': (0, 1)
-        }
+        walls = self.level.walls
+        dead_squares = self.level.dead_squares
+        boxes = self.boxes
 
-        for action_name, (dr, dc) in possible_moves.items():
-            new_player_pos = (self.player_pos[0] + dr, self.player_pos[1] + dc)
-            action_cost = 1
+        for action_name in ACTIONS:
+            offset = self.level.offsets[action_name]
+            new_player = self.player + offset
+            action_cost = WALK_COST
 
-            if self.is_wall(new_player_pos):
+            if walls[new_player]:
                 continue
 
-            if self.is_box(new_player_pos):
-                new_box_pos = (new_player_pos[0] + dr, new_player_pos[1] + dc)
-                if self.is_wall(new_box_pos) or self.is_box(new_box_pos):
+            if (boxes >> new_player) & 1:
+                new_box = new_player + offset
+                if walls[new_box] or (boxes >> new_box) & 1:
                     continue
 
                 # Check deadlock chỉ với box vừa đẩy
-                if self.is_deadlock_at(new_box_pos):
+                if dead_squares[new_box]:
                     continue
 
-                action_cost += 1
+                action_cost = PUSH_COST
 
             # Nếu không có box hoặc hợp lệ thì thêm action
             actions.append((action_name, action_cost))
@@ -81,86 +93,199 @@ class GameState:
         return actions
 
     def apply_action(self, action, action_cost):
-        DIRECTIONS = {
-            'UP': (-1, 0),
-            'DOWN': (1, 0),
-            'LEFT': (0, -1),
-            'RIGHT': (0, 1)
-        }
-
-        dr, dc = DIRECTIONS[action]
-        new_player_pos = (self.player_pos[0] + dr, self.player_pos[1] + dc)
-        new_box_positions = set(self.box_positions)
+        level = self.level
+        offset = level.offsets[action]
+        new_player = self.player + offset
+        new_boxes = self.boxes
+        new_key = self.key ^ level.zobrist_player[self.player] ^ level.zobrist_player[new_player]
 
-        if self.is_box(new_player_pos):
-            pushed_box_old_pos = new_player_pos
-            new_box_pos = (pushed_box_old_pos[0] + dr, pushed_box_old_pos[1] + dc)
-
-            new_box_positions.remove(pushed_box_old_pos)
-            new_box_positions.add(new_box_pos)
+        if (new_boxes >> new_player) & 1:
+            new_box = new_player + offset
+            new_boxes ^= (1 << new_player) | (1 << new_box)
+            new_key ^= level.zobrist_boxes[new_player] ^ level.zobrist_boxes[new_box]
 
         return GameState(
-            player_pos=new_player_pos,
-            box_positions=frozenset(new_box_positions),
-            wall_positions=self.wall_positions,
-            goal_positions=self.goal_positions,
-            map_dims=self.map_dims,
-            parent=self,
-            previous_action=action,
+            level,
+            new_player,
+            new_boxes,
             cost=self.cost + action_cost,
-            depth=self.depth + 1
+            key=new_key
         )
 
+    def get_reachable_cells(self):
+        """Flood-fills the cells the player can walk to without pushing; 1 marks reachable."""
+        walls = self.level.walls
+        boxes = self.boxes
+        offsets = self.level.offsets.values()
+        reachable = bytearray(self.level.n_cells)
+        reachable[self.player] = 1
+        stack = [self.player]
+
+        while stack:
+            cell = stack.pop()
+            for offset in offsets:
+                next_cell = cell + offset
+                if reachable[next_cell] or walls[next_cell] or (boxes >> next_cell) & 1:
+                    continue
+                reachable[next_cell] = 1
+                stack.append(next_cell)
+
+        return reachable
+
+    def normalized(self):
+        """Returns this state with the player moved to the canonical (lowest) cell of its region."""
+        canonical = self.get_reachable_cells().index(1)
+        if canonical == self.player:
+            return self
+        level = self.level
+        key = self.key ^ level.zobrist_player[self.player] ^ level.zobrist_player[canonical]
+        return GameState(level, canonical, self.boxes, cost=self.cost, key=key)
+
+    def get_possible_pushes(self, reachable=None):
+        """Push-level counterpart of get_possible_actions: every box push the player can walk to.
+
+        A push is encoded as box_cell * len(ACTIONS) + direction index.
+        """
+        pushes = []
+        level = self.level
+        walls = level.walls
+        dead_squares = level.dead_squares
+        boxes = self.boxes
+        if reachable is None:
+            reachable = self.get_reachable_cells()
+        n_directions = len(ACTIONS)
+
+        for box in iter_cells(boxes):
+            for direction, action_name in enumerate(ACTIONS):
+                offset = level.offsets[action_name]
+                new_box = box + offset
+                if not reachable[box - offset] or walls[new_box] or dead_squares[new_box] or \
+                        (boxes >> new_box) & 1:
+                    continue
+                pushes.append((box * n_directions + direction, PUSH_COST))
+
+        return pushes
+
+    def apply_push(self, push, push_cost, length=1):
+        """Applies an encoded push (repeated length times in a straight line) and returns the normalized successor."""
+        level = self.level
+        box, direction = divmod(push, len(ACTIONS))
+        offset = level.offsets[ACTIONS[direction]]
+        new_box = box + length * offset
+        new_player = new_box - offset
+        key = self.key ^ level.zobrist_player[self.player] ^ level.zobrist_player[new_player] ^ \
+            level.zobrist_boxes[box] ^ level.zobrist_boxes[new_box]
+
+        return GameState(
+            level,
+            new_player,
+            self.boxes ^ (1 << box) ^ (1 << new_box),
+            cost=self.cost + push_cost,
+            key=key
+        ).normalized()
+
+    def get_possible_pulls(self, reachable=None):
+        """Reverse moves for backward search: every box the player can walk to and pull one step.
+
+        A pull is encoded like a push, box_cell * len(ACTIONS) + direction
+        index, where the direction is the way the box moves. The player stands
+        next to the box on that side and needs one more free cell behind.
+        """
+        pulls = []
+        level = self.level
+        walls = level.walls
+        boxes = self.boxes
+        if reachable is None:
+            reachable = self.get_reachable_cells()
+
+        for box in iter_cells(boxes):
+            for direction, action_name in enumerate(ACTIONS):
+                offset = level.offsets[action_name]
+                new_player = box + 2 * offset
+                if not reachable[box + offset] or walls[new_player] or (boxes >> new_player) & 1:
+                    continue
+                pulls.append((box * len(ACTIONS) + direction, PUSH_COST))
+
+        return pulls
+
+    def apply_pull(self, pull, pull_cost):
+        """Applies an encoded pull and returns the normalized predecessor state."""
+        level = self.level
+        box, direction = divmod(pull, len(ACTIONS))
+        offset = level.offsets[ACTIONS[direction]]
+        new_box = box + offset
+        new_player = new_box + offset
+        key = self.key ^ level.zobrist_player[self.player] ^ level.zobrist_player[new_player] ^ \
+            level.zobrist_boxes[box] ^ level.zobrist_boxes[new_box]
+
+        return GameState(
+            level,
+            new_player,
+            self.boxes ^ (1 << box) ^ (1 << new_box),
+            cost=self.cost + pull_cost,
+            key=key
+        ).normalized()
+
+    def get_walk(self, target):
+        """Shortest list of walking actions from the player to target, or None if unreachable."""
+        walls = self.level.walls
+        boxes = self.boxes
+        offsets = self.level.offsets
+        came_from = {self.player: None}
+        q = deque([self.player])
+
+        while q:
+            cell = q.popleft()
+            if cell == target:
+                walk = []
+                while came_from[cell] is not None:
+                    cell, action = came_from[cell]
+                    walk.append(action)
+                return walk[::-1]
+
+            for action_name in ACTIONS:
+                next_cell = cell + offsets[action_name]
+                if next_cell in came_from or walls[next_cell] or (boxes >> next_cell) & 1:
+                    continue
+                came_from[next_cell] = (cell, action_name)
+                q.append(next_cell)
+
+        return None
+
     def __hash__(self):
-        return hash((self.player_pos, self.box_positions))
+        return self.key
 
     def __eq__(self, other):
         if not isinstance(other, GameState):
             return NotImplemented
-        return self.player_pos == other.player_pos and \
-            self.box_positions == other.box_positions
+        # Different keys always mean different states; only a key collision
+        # needs the full comparison.
+        return self.key == other.key and self.player == other.player and \
+            self.boxes == other.boxes
 
     def __lt__(self, other): # For priority queue (UCS, A*)
         return self.cost < other.cost
 
-    def get_path(self):
-        """Reconstructs the path of (action, cost) from the initial state to this state."""
-        path = []
-        current = self
-        while current.parent is not None:
-            path.append((current.previous_action, current.cost - current.parent.cost))  # Include cost here
-            current = current.parent
-        return path[::-1]  # Reverse to get path from start
-
     def get_mahattan_distances_from_goal_to_all_nodes(self):
-        from queue import Queue
-
-        q = Queue()
-        visited = set()
+        """Walking distance from the nearest goal to every reachable cell, keyed by cell index."""
+        walls = self.level.walls
+        offsets = tuple(self.level.offsets.values())
         distances = {}
 
-        directions = {
-            'UP': (-1, 0), 'DOWN': (1, 0),
-            'LEFT': (0, -1), 'RIGHT': (0, 1)
-        }
+        q = deque()
+        for goal in iter_cells(self.level.goal_mask):
+            q.append(goal)
+            distances[goal] = 0
 
-        for goal in self.goal_positions:
-            q.put((goal, 0))
-            visited.add(goal)
+        while q:
+            cell = q.popleft()
+            dist = distances[cell] + 1
 
-        while not q.empty():
-            (r, c), dist = q.get()
-            distances[(r, c)] = dist
-
-            for dr, dc in directions.values():
-                nr, nc = r + dr, c + dc
-
-                if (nr, nc) in visited:
+            for offset in offsets:
+                next_cell = cell + offset
+                if next_cell in distances or walls[next_cell]:
                     continue
-                if self.is_wall((nr, nc)):
-                    continue
-
-                visited.add((nr, nc))
-                q.put(((nr, nc), dist + 1))
+                distances[next_cell] = dist
+                q.append(next_cell)
 
         return distances
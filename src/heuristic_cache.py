@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+from config import HEURISTIC_CACHE_MB
+
+ENTRY_BYTES = 200  # Rough size of one entry: dict slot, tuple, box mask and value
+MATCHING_ENTRY_BYTES = 600  # Same for a BoxGoalMatching value: its cell, row and dual lists
+
+
+class HeuristicCache:
+    """Bounded LRU cache for heuristics that depend on the boxes only.
+
+    Entries are keyed on the boxes' part of the Zobrist key (the state key
+    with the player's term XORed out). States that differ only in the player
+    share one entry. The box mask is stored too, so a key collision counts as
+    a miss instead of returning a wrong value.
+    """
+
+    def __init__(self, max_mb=HEURISTIC_CACHE_MB, entry_bytes=ENTRY_BYTES):
+        self.max_entries = max(1, max_mb * 1024 * 1024 // entry_bytes)
+        self.entries = OrderedDict()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def get_box_key(state):
+        return state.key ^ state.level.zobrist_player[state.player]
+
+    def _lookup(self, box_key, boxes):
+        entry = self.entries.get(box_key)
+        if entry is not None and entry[0] == boxes:
+            self.entries.move_to_end(box_key)
+            self.n_hits += 1
+            return entry
+        self.n_misses += 1
+        return None
+
+    def _store(self, box_key, boxes, value):
+        self.entries[box_key] = (boxes, value)
+        self.entries.move_to_end(box_key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, state, heuristic, *args):
+        """Returns heuristic(state, *args), computing it only for box sets not seen recently."""
+        box_key = self.get_box_key(state)
+        entry = self._lookup(box_key, state.boxes)
+        if entry is not None:
+            return entry[1]
+        value = heuristic(state, *args)
+        self._store(box_key, state.boxes, value)
+        return value
+
+
+_shared_caches = {}
+
+
+def get_heuristic_cache(level, name, entry_bytes=ENTRY_BYTES):
+    """Cache shared by every algorithm in this process for one heuristic on one level layout."""
+    cache_key = (level.layout_hash(), name)
+    cache = _shared_caches.get(cache_key)
+    if cache is None:
+        cache = _shared_caches[cache_key] = HeuristicCache(entry_bytes=entry_bytes)
+    return cache
@@ -0,0 +1,151 @@
+from collections import deque
+
+import numpy as np
+
+from src.static_level import iter_cells
+
+UNREACHABLE_PUSHES = int(np.iinfo(np.uint16).max)  # Table entry for a goal a box cannot be pushed to
+UNREACHABLE_STEPS = int(np.iinfo(np.uint16).max)  # Table entry for floor cells the player cannot walk between
+
+
+class LevelTables:
+    """Per-level precomputation bundle for the heuristics, built once by load_map.
+
+    push_distances[g, cell] is the least number of pushes that bring a lone
+    box from cell onto goal g. It comes from a pull BFS backwards from each
+    goal over (box cell, player side) nodes. A pull is only allowed when the
+    player can walk round the box to the side it pulls from, so corridors
+    and one-way corners count the way they really play.
+
+    floor_distances[floor_index[a], floor_index[b]] is the walking distance
+    between two floor cells when boxes are ignored. All sources are expanded
+    at once, one BFS layer per NumPy step.
+    """
+
+    def __init__(self, level):
+        self.goals = tuple(iter_cells(level.goal_mask))
+
+        side_components = self._compute_side_components(level)
+        self.push_distances = np.array(
+            [self._pull_distances(level, goal, side_components) for goal in self.goals],
+            dtype=np.uint16
+        ).reshape(len(self.goals), level.n_cells)
+
+        self.nearest_push_array = self.push_distances.min(axis=0, initial=UNREACHABLE_PUSHES)
+        # Plain lists for per-node lookups; indexing the array from Python is slower
+        self.cell_push_distances = self.push_distances.T.tolist()  # [cell][goal]
+        self.nearest_push_distances = self.nearest_push_array.tolist()
+
+        self.floor_cells = np.array([cell for cell in range(level.n_cells) if not level.walls[cell]], dtype=np.int32)
+        self.floor_index = [-1] * level.n_cells
+        for i, cell in enumerate(self.floor_cells.tolist()):
+            self.floor_index[cell] = i
+        self.floor_index_array = np.array(self.floor_index, dtype=np.int32)
+        self.floor_distances = self._compute_floor_distances(level, self.floor_cells, self.floor_index)
+
+    def get_player_distances(self, player):
+        """Row of floor_distances for the player's cell; index it with floor_index."""
+        return self.floor_distances[self.floor_index[player]]
+
+    @staticmethod
+    def _compute_floor_distances(level, floor_cells, floor_index):
+        n_floor = len(floor_cells)
+        # neighbours[i, k]: floor index of the k-th neighbour of floor cell i, or n_floor for a wall
+        neighbours = np.full((n_floor, len(level.offsets)), n_floor, dtype=np.int32)
+        for i, cell in enumerate(floor_cells.tolist()):
+            for k, offset in enumerate(level.offsets.values()):
+                if floor_index[cell + offset] != -1:
+                    neighbours[i, k] = floor_index[cell + offset]
+
+        distances = np.full((n_floor, n_floor), UNREACHABLE_STEPS, dtype=np.uint16)
+        np.fill_diagonal(distances, 0)
+        reached = np.eye(n_floor, dtype=bool)
+        # frontier[s, c]: c is exactly `step` moves from s; the extra False column stands for walls
+        frontier = np.zeros((n_floor, n_floor + 1), dtype=bool)
+        frontier[:, :n_floor] = reached
+
+        step = 0
+        while True:
+            step += 1
+            layer = np.zeros((n_floor, n_floor), dtype=bool)
+            for k in range(neighbours.shape[1]):
+                layer |= frontier[:, neighbours[:, k]]
+            layer &= ~reached
+            if not layer.any():
+                return distances
+            distances[layer] = step
+            reached |= layer
+            frontier[:, :n_floor] = layer
+
+    @staticmethod
+    def _compute_side_components(level):
+        """For every floor cell, which of its four neighbours the player can walk between when a box sits on it.
+
+        Neighbours with the same label are connected around the box; -1 marks a wall.
+        """
+        walls = level.walls
+        offsets = [level.offsets[action] for action in level.offsets]
+        side_components = [None] * level.n_cells
+
+        for box in range(level.n_cells):
+            if walls[box]:
+                continue
+            labels = [-1] * len(offsets)
+            for side, offset in enumerate(offsets):
+                start = box + offset
+                if walls[start] or labels[side] != -1:
+                    continue
+                seen = {box, start}
+                stack = [start]
+                while stack:
+                    cell = stack.pop()
+                    for next_offset in offsets:
+                        next_cell = cell + next_offset
+                        if next_cell not in seen and not walls[next_cell]:
+                            seen.add(next_cell)
+                            stack.append(next_cell)
+                for other_side, other_offset in enumerate(offsets):
+                    if box + other_offset in seen:
+                        labels[other_side] = side
+            side_components[box] = labels
+
+        return side_components
+
+    @staticmethod
+    def _pull_distances(level, goal, side_components):
+        """Pushes needed from every cell to goal: min over player sides of a pull BFS from goal."""
+        walls = level.walls
+        offsets = [level.offsets[action] for action in level.offsets]
+        n_sides = len(offsets)
+        distances = [UNREACHABLE_PUSHES] * (level.n_cells * n_sides)  # (box cell, player side)
+
+        q = deque()
+        for side, offset in enumerate(offsets):
+            if not walls[goal + offset]:
+                distances[goal * n_sides + side] = 0
+                q.append((goal, side))
+
+        while q:
+            box, side = q.popleft()
+            dist = distances[box * n_sides + side] + 1
+            components = side_components[box]
+            for pull_side, offset in enumerate(offsets):
+                # The player walks round to box + offset and pulls the box one step that way
+                new_box = box + offset
+                if walls[new_box] or walls[new_box + offset] or components[pull_side] != components[side]:
+                    continue
+                node = new_box * n_sides + pull_side
+                if distances[node] > dist:
+                    distances[node] = dist
+                    q.append((new_box, pull_side))
+
+        pushes = [min(distances[cell * n_sides:(cell + 1) * n_sides]) for cell in range(level.n_cells)]
+        pushes[goal] = 0  # Even a goal walled in on every side is reached by a box already on it
+        return pushes
+
+
+def get_level_tables(level):
+    """Returns the level's LevelTables, building them on first use."""
+    if level.tables is None:
+        level.tables = LevelTables(level)
+    return level.tables
@@ -1,6 +1,8 @@
 # code nguyên bản của AI chưa chỉnh sửa
 
 from .game_state import GameState
+from .static_level import StaticLevel
+from .level_tables import get_level_tables
 from config import PLAYER_CHAR, PLAYER_ON_GOAL_CHAR, BOX_CHAR, BOX_ON_GOAL_CHAR, \
                    WALL_CHAR, GOAL_CHAR, FLOOR_CHAR
 
@@ -43,4 +45,7 @@ def load_map(filepath):
 
     map_dims = (r + 1, max_cols) # r will be the last row index
 
-    return GameState(player_pos, list(box_positions), wall_positions, goal_positions, map_dims)
\ No newline at end of file
+    level = StaticLevel(wall_positions, goal_positions, map_dims)
+    get_level_tables(level) # Built once here so solver processes inherit it
+
+    return GameState(level, level.to_cell(player_pos), level.to_mask(box_positions))
\ No newline at end of file
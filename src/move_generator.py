@@ -0,0 +1,178 @@
+from config import PUSH_LEVEL_SEARCH, FREEZE_DEADLOCK_CHECK, CORRAL_PRUNING, DEADLOCK_PATTERNS, TUNNEL_MACROS
+from src.deadlock import FreezeDeadlockDetector, CorralPruner
+from src.deadlock_patterns import DeadlockPatternStore
+from src.game_state import GameState, WALK_COST, PUSH_COST
+from src.static_level import ACTIONS
+
+# A macro edge is stored as (length << MACRO_SHIFT) | action code, with length >= 2
+MACRO_SHIFT = 20
+
+
+def encode_macro(action_code, length):
+    return action_code if length == 1 else (length << MACRO_SHIFT) | action_code
+
+
+def decode_macro(action):
+    """Splits a stored action into (action code or name, length)."""
+    if isinstance(action, str) or action < (1 << MACRO_SHIFT):
+        return action, 1
+    return action & ((1 << MACRO_SHIFT) - 1), action >> MACRO_SHIFT
+
+
+class MoveGenerator:
+    """Successor function shared by the search algorithms.
+
+    In push-level mode every edge is one box push and states keep the player
+    on the canonical cell of its region. The walks between pushes are filled
+    back in by get_solution once a solution has been found.
+
+    With freeze_check on, pushes that freeze boxes off their goals are pruned.
+    With corral_pruning on, states with a proven corral deadlock get no
+    successors. In push-level mode, pushes are also limited to the barrier of
+    a PI-corral when one exists. With deadlock_patterns on, the corral
+    deadlocks proven so far are kept in a per-level DeadlockPatternStore and
+    matched before any new analysis, also in later runs. Each pruner keeps
+    counters that show what it costs.
+
+    With tunnel_macros on, a push that leaves the player and the box in a
+    one-wide tunnel keeps pushing until the box leaves it, reaches a goal or
+    gets stuck. In step-level mode a walk into a tunnel likewise runs on to
+    its end or to the next box. Each run is a single macro edge with the
+    summed cost, and get_solution expands it back into primitive moves.
+    """
+
+    def __init__(self, push_level=PUSH_LEVEL_SEARCH, freeze_check=FREEZE_DEADLOCK_CHECK,
+                 corral_pruning=CORRAL_PRUNING, deadlock_patterns=DEADLOCK_PATTERNS,
+                 tunnel_macros=TUNNEL_MACROS):
+        self.push_level = push_level
+        self.tunnel_macros = tunnel_macros
+        self.freeze_check = freeze_check
+        self.corral_pruning = corral_pruning
+        self.deadlock_patterns = deadlock_patterns
+        self.freeze_detector = None
+        self.corral_pruner = None
+        self.pattern_store = None
+
+    def get_initial_state(self, state: GameState):
+        if self.freeze_check:
+            self.freeze_detector = FreezeDeadlockDetector(state.level)
+        if self.deadlock_patterns:
+            self.pattern_store = DeadlockPatternStore(state.level)
+        if self.corral_pruning:
+            self.corral_pruner = CorralPruner(state.level, state.player, pattern_store=self.pattern_store)
+        return state.normalized() if self.push_level else state
+
+    def get_successors(self, state: GameState):
+        """Returns (action, action_cost, next_state) for every move allowed from state."""
+        successors = []
+        offsets = state.level.offsets
+        n_directions = len(ACTIONS)
+
+        allowed_pushes = None
+        reachable = None
+        if self.corral_pruner or self.pattern_store:
+            reachable = state.get_reachable_cells()
+        if self.pattern_store and self.pattern_store.is_deadlock(state.boxes, reachable):
+            return successors
+        if self.corral_pruner:
+            allowed_pushes = self.corral_pruner.get_allowed_pushes(state, reachable)
+            if allowed_pushes is not None and not allowed_pushes:
+                return successors
+            if not self.push_level:
+                # Postponing the other pushes can lengthen the walks in between,
+                # so step-level search only takes the corral deadlocks.
+                allowed_pushes = None
+
+        if self.push_level:
+            for push, push_cost in state.get_possible_pushes(reachable):
+                if allowed_pushes is not None and push not in allowed_pushes:
+                    continue
+                box, direction = divmod(push, n_directions)
+                action = ACTIONS[direction]
+                length = self._get_push_run(state, box + offsets[action], action) if self.tunnel_macros else 1
+                new_box = box + length * offsets[action]
+                if self.freeze_detector and \
+                        self.freeze_detector.is_deadlock(state.boxes ^ (1 << box) ^ (1 << new_box), new_box):
+                    continue
+                successors.append((encode_macro(push, length), push_cost * length,
+                                   state.apply_push(push, push_cost * length, length)))
+            return successors
+
+        for action, action_cost in state.get_possible_actions():
+            next_state = state.apply_action(action, action_cost)
+            length = 1
+            if self.tunnel_macros:
+                if action_cost == PUSH_COST:
+                    run = self._get_push_run(next_state, next_state.player + offsets[action], action)
+                else:
+                    run = self._get_walk_run(next_state, action)
+                for _ in range(run - 1):
+                    next_state = next_state.apply_action(action, action_cost)
+                length = run
+            if action_cost == PUSH_COST and self.freeze_detector and \
+                    self.freeze_detector.is_deadlock(next_state.boxes, next_state.player + offsets[action]):
+                continue
+            if length > 1:
+                action = encode_macro(ACTIONS.index(action), length)
+            successors.append((action, action_cost * length, next_state))
+        return successors
+
+    @staticmethod
+    def _get_push_run(state, box, action):
+        """Number of pushes in a row, the first included, for a box just pushed onto box by action."""
+        level = state.level
+        offset = level.offsets[action]
+        flag = level.get_tunnel_flag(action)
+        tunnels = level.tunnels
+        player = box - offset
+        length = 1
+        while tunnels[player] & flag and tunnels[box] & flag and not level.is_goal_cell(box):
+            next_box = box + offset
+            if level.walls[next_box] or level.dead_squares[next_box] or (state.boxes >> next_box) & 1:
+                break
+            player, box = box, next_box
+            length += 1
+        return length
+
+    @staticmethod
+    def _get_walk_run(state, action):
+        """Number of steps in a row, the first included, for a player that just walked by action."""
+        level = state.level
+        offset = level.offsets[action]
+        flag = level.get_tunnel_flag(action)
+        player = state.player
+        length = 1
+        while level.tunnels[player] & flag:
+            next_cell = player + offset
+            if level.walls[next_cell] or (state.boxes >> next_cell) & 1:
+                break
+            player = next_cell
+            length += 1
+        return length
+
+    def get_solution(self, initial_state: GameState, path):
+        """Turns a search path into the (action, cost) moves played from initial_state."""
+        solution = []
+        if not self.push_level:
+            for action, action_cost in path:
+                action, length = decode_macro(action)
+                if length > 1:
+                    action = ACTIONS[action]
+                solution.extend([(action, action_cost // length)] * length)
+            return solution
+
+        state = initial_state
+        for push, push_cost in path:
+            push, length = decode_macro(push)
+            box, direction = divmod(push, len(ACTIONS))
+            action = ACTIONS[direction]
+
+            for step in state.get_walk(box - state.level.offsets[action]):
+                solution.append((step, WALK_COST))
+                state = state.apply_action(step, WALK_COST)
+
+            for _ in range(length):
+                solution.append((action, push_cost // length))
+                state = state.apply_action(action, push_cost // length)
+
+        return solution
@@ -0,0 +1,56 @@
+from array import array
+
+from src.static_level import ACTIONS
+
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+ROOT_PARENT = -1
+
+
+class NodeArena:
+    """Search tree stored as parallel array columns indexed by integer node id.
+
+    Frontiers hold (node_id, state) instead of parent links or copied path
+    lists; the (action, cost) path is only rebuilt once a goal is found.
+    Walking actions are stored by their index in ACTIONS and come back as
+    names. Encoded pushes from GameState.get_possible_pushes and macro edges
+    from MoveGenerator are stored unchanged. They never collide with those indices, because a box cannot sit
+    on cell 0 of the padded grid.
+    """
+
+    def __init__(self):
+        self.parents = array('i')
+        self.actions = array('i')
+        self.costs = array('i')  # g-cost of the node
+
+    def __len__(self):
+        return len(self.costs)
+
+    def add_root(self, cost=0):
+        return self.add(ROOT_PARENT, None, cost)
+
+    def add(self, parent_id, action, cost):
+        """Appends a node reached from parent_id by action and returns its id."""
+        node_id = len(self.costs)
+        self.parents.append(parent_id)
+        if action is None:
+            action = -1
+        elif isinstance(action, str):
+            action = ACTION_CODES[action]
+        self.actions.append(action)
+        self.costs.append(cost)
+        return node_id
+
+    def get_path(self, node_id):
+        """Reconstructs the path of (action, cost) from the root to node_id."""
+        parents = self.parents
+        costs = self.costs
+        path = []
+        while parents[node_id] != ROOT_PARENT:
+            parent_id = parents[node_id]
+            action = self.actions[node_id]
+            if action < len(ACTIONS):
+                action = ACTIONS[action]
+            path.append((action, costs[node_id] - costs[parent_id]))
+            node_id = parent_id
+        return path[::-1]  # Reverse to get path from start
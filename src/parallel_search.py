@@ -0,0 +1,402 @@
+import os
+import time
+from array import array
+from heapq import heappush, heappop
+from itertools import count
+from multiprocessing import Process, Queue, Array, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+
+from config import HDA_WORKERS, HDA_BATCH_SIZE, BFS_WORKERS
+from src.algorithms import Heuristics
+from src.box_goal_matching import BoxGoalMatcher
+from src.game_state import GameState
+from src.heuristic_cache import get_heuristic_cache, MATCHING_ENTRY_BYTES
+from src.move_generator import MoveGenerator
+from src.node_arena import NodeArena, ROOT_PARENT, ACTION_CODES
+from src.static_level import ACTIONS, iter_cells
+
+NO_COST = 1 << 62  # Incumbent cost before any solution is found
+EXPANSIONS_PER_POLL = 64  # Expansions between two looks at the inbox
+IDLE_WAIT = 0.05  # Seconds an idle worker blocks on its inbox
+POLL_INTERVAL = 0.005  # Seconds between two termination checks
+
+# Per-worker slots of the shared counter array
+SENT, RECEIVED, IDLE, EXPANDED = range(4)
+
+
+def get_owner(state, n_workers):
+    """Worker that owns state: its Zobrist key spread over the workers."""
+    return state.key % n_workers
+
+
+def hda_star_worker(worker_id, initial_state, moves, inboxes, replies, counters, incumbent, parent_pid):
+    """One HDA* worker: A* over the states it owns, children sent to their owners in batches.
+
+    Inbox messages are a batch (list of child entries), ("path", node_id) to
+    report one node of the solution path, or None to stop.
+    """
+    n_workers = len(inboxes)
+    inbox = inboxes[worker_id]
+
+    def slot(counter):
+        return counter * n_workers + worker_id
+
+    root_state = moves.get_initial_state(initial_state)
+    level = root_state.level
+    matcher = BoxGoalMatcher(level)
+    matching_cache = get_heuristic_cache(level, "matching", entry_bytes=MATCHING_ENTRY_BYTES)
+
+    arena = NodeArena()
+    parent_workers = array('i')  # Owner of each node's parent; the parent id in arena is local to it
+    best = {}  # state -> (g, node_id)
+    frontier = []  # Heap of (f, h, tie, node_id, state, g)
+    counter = count()
+    outboxes = [[] for _ in range(n_workers)]
+
+    def add(entry):
+        player, boxes, key, g, h, parent_worker, parent_id, action = entry
+        state = GameState(level, player, boxes, cost=g, key=key)
+        if g >= best.get(state, (NO_COST,))[0]:
+            return
+        node_id = arena.add(parent_id, action, g)
+        parent_workers.append(parent_worker)
+        best[state] = (g, node_id)
+        heappush(frontier, (g + h, h, next(counter), node_id, state, g))
+
+    def send(owner):
+        # Count before putting, so a batch in flight always shows as sent > received
+        counters[slot(SENT)] += 1
+        batch, outboxes[owner] = outboxes[owner], []
+        inboxes[owner].put(batch)
+
+    def handle(message):
+        """Processes one inbox message; returns False on stop."""
+        if message is None:
+            return False
+        if isinstance(message, tuple):
+            _, node_id = message
+            replies.put((parent_workers[node_id], arena.parents[node_id], arena.actions[node_id], arena.costs[node_id]))
+            return True
+        counters[slot(IDLE)] = 0
+        for entry in message:
+            add(entry)
+        counters[slot(RECEIVED)] += 1
+        return True
+
+    if get_owner(root_state, n_workers) == worker_id:
+        root_matching = matching_cache.get(root_state, matcher.get_matching)
+        add((root_state.player, root_state.boxes, root_state.key, 0,
+             Heuristics.matching_heuristic(root_state, root_matching, matcher, moves.push_level), -1, ROOT_PARENT, None))
+
+    n_expanded = 0
+    while True:
+        if os.getppid() != parent_pid:
+            return  # The coordinator is gone (e.g. terminated on timeout)
+
+        bound = incumbent[0]
+        if not frontier or frontier[0][0] >= bound:
+            # Nothing here can beat the incumbent: flush, report idle and wait for work
+            for owner in range(n_workers):
+                if outboxes[owner]:
+                    send(owner)
+            counters[slot(EXPANDED)] = n_expanded
+            counters[slot(IDLE)] = 1
+            try:
+                message = inbox.get(timeout=IDLE_WAIT)
+            except Empty:
+                continue
+            if not handle(message):
+                return
+
+        try:
+            while True:
+                if not handle(inbox.get_nowait()):
+                    return
+        except Empty:
+            pass
+
+        bound = incumbent[0]
+        for _ in range(EXPANSIONS_PER_POLL):
+            if not frontier or frontier[0][0] >= bound:
+                break
+            _, _, _, node_id, current_state, g = heappop(frontier)
+            if g > best[current_state][0]:
+                continue  # Stale entry
+            n_expanded += 1
+
+            if current_state.is_win():
+                with incumbent.get_lock():
+                    if g < incumbent[0]:
+                        incumbent[0], incumbent[1], incumbent[2] = g, worker_id, node_id
+                bound = incumbent[0]
+                continue
+
+            matching = matching_cache.get(current_state, matcher.get_matching)
+            for action, action_cost, next_state in moves.get_successors(current_state):
+                new_cost = g + action_cost
+                next_matching = matching_cache.get(next_state, matcher.get_matching, matching)
+                h = Heuristics.matching_heuristic(next_state, next_matching, matcher, moves.push_level)
+                if new_cost + h >= bound:
+                    continue  # Includes h = inf: some box can no longer reach a goal
+                entry = (next_state.player, next_state.boxes, next_state.key, new_cost, h, worker_id, node_id, action)
+                owner = get_owner(next_state, n_workers)
+                if owner == worker_id:
+                    add(entry)
+                else:
+                    outboxes[owner].append(entry)
+                    if len(outboxes[owner]) >= HDA_BATCH_SIZE:
+                        send(owner)
+        counters[slot(EXPANDED)] = n_expanded
+
+
+def get_reply(replies, workers):
+    """Next message from the workers; raises RuntimeError instead of waiting forever if one has died."""
+    while True:
+        try:
+            return replies.get(timeout=IDLE_WAIT)
+        except Empty:
+            if not all(worker.is_alive() for worker in workers):
+                raise RuntimeError("A search worker exited unexpectedly.")
+
+
+def encode_state(state):
+    """Packed record of a state: player cell, then the box cells in increasing order (uint16 each)."""
+    return array('H', [state.player, *iter_cells(state.boxes)]).tobytes()
+
+
+def decode_state(level, record):
+    """State of a record given as a sequence of uint16 cells (e.g. a memoryview cast to 'H')."""
+    player, *box_cells = record
+    boxes = 0
+    for cell in box_cells:
+        boxes |= 1 << cell
+    return GameState(level, player, boxes)
+
+
+def parallel_bfs_worker(worker_id, initial_state, moves, commands, exchanges, replies, parent_pid):
+    """One layered-BFS worker: expands a slice of each layer, then deduplicates its hash partition.
+
+    A command is (layer name, number of states, first index, end index) or
+    None to stop. Children go to the exchange queue of their owner, one
+    bucket per worker and layer, as (record, parent index, action code,
+    action cost, is_win). The worker keeps the visited records of its own
+    partition and replies with the new ones.
+    """
+    n_workers = len(exchanges)
+    root_state = moves.get_initial_state(initial_state)
+    level = root_state.level
+    record_size = 1 + bin(root_state.boxes).count('1')
+
+    visited = set()
+    if get_owner(root_state, n_workers) == worker_id:
+        visited.add(encode_state(root_state))
+
+    while True:
+        try:
+            command = commands.get(timeout=IDLE_WAIT)
+        except Empty:
+            if os.getppid() != parent_pid:
+                return  # The coordinator is gone (e.g. terminated on timeout)
+            continue
+        if command is None:
+            return
+        layer_name, n_states, start, end = command
+
+        # --- Expand this worker's slice of the layer ---
+        buckets = [[] for _ in range(n_workers)]
+        shm = SharedMemory(name=layer_name)
+        with shm.buf.cast('H') as cells:
+            for index in range(start, end):
+                current_state = decode_state(level, cells[index * record_size:(index + 1) * record_size])
+                for action, action_cost, next_state in moves.get_successors(current_state):
+                    buckets[get_owner(next_state, n_workers)].append((
+                        encode_state(next_state), index, ACTION_CODES.get(action, action),
+                        action_cost, next_state.is_win()
+                    ))
+        shm.close()
+        for owner, bucket in enumerate(buckets):
+            exchanges[owner].put(bucket)
+
+        # --- Deduplicate the children this worker owns, from every worker ---
+        new_records = []
+        parents = array('i')
+        actions = array('i')
+        costs = array('i')
+        goal = -1
+        for _ in range(n_workers):
+            for record, parent, action, action_cost, is_win in exchanges[worker_id].get():
+                if record in visited:
+                    continue
+                visited.add(record)
+                if is_win and goal < 0:
+                    goal = len(new_records)
+                new_records.append(record)
+                parents.append(parent)
+                actions.append(action)
+                costs.append(action_cost)
+
+        replies.put((worker_id, b''.join(new_records), parents, actions, costs, goal))
+
+
+class ParallelSearch:
+    """Searches that split the work over several worker processes."""
+
+    @staticmethod
+    def hda_star(initial_state: GameState, moves: MoveGenerator = None, n_workers=HDA_WORKERS):
+        """Hash-distributed A*: each worker owns the states whose Zobrist key maps to it.
+
+        Every worker runs A* on its own open and closed lists and sends the
+        children it generates to their owners in batches. A worker is idle when
+        its best f cannot beat the incumbent solution. The search ends when all
+        workers are idle and every batch sent has been received, seen in two
+        identical snapshots of the counters in a row. Then no open node can
+        lead to a cheaper solution, so the incumbent is optimal.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        n_workers = max(1, n_workers)
+        inboxes = [Queue() for _ in range(n_workers)]
+        replies = Queue()
+        counters = Array('q', 4 * n_workers, lock=False)  # [counter * n_workers + worker]
+        incumbent = Array('q', [NO_COST, -1, -1])  # cost, owner and node id of the best goal
+
+        workers = [
+            Process(target=hda_star_worker,
+                    args=(worker_id, initial_state, moves, inboxes, replies, counters, incumbent, os.getpid()),
+                    daemon=True)
+            for worker_id in range(n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def is_done(snapshot):
+            sent = sum(snapshot[SENT * n_workers:(SENT + 1) * n_workers])
+            received = sum(snapshot[RECEIVED * n_workers:(RECEIVED + 1) * n_workers])
+            return sent == received and all(snapshot[IDLE * n_workers:(IDLE + 1) * n_workers])
+
+        last_snapshot = None
+        while True:
+            time.sleep(POLL_INTERVAL)
+            if not all(worker.is_alive() for worker in workers):
+                raise RuntimeError("A search worker exited unexpectedly.")  # Its idle flag would never be set
+            snapshot = counters[:]
+            if is_done(snapshot) and snapshot == last_snapshot:
+                break
+            last_snapshot = snapshot
+        n_explored_nodes = sum(snapshot[EXPANDED * n_workers:(EXPANDED + 1) * n_workers])
+
+        solution = None
+        best_cost, worker_id, node_id = incumbent[:]
+        if best_cost != NO_COST:
+            # Walk the parent links back to the root, asking each owner for its node
+            reversed_path = []
+            while True:
+                inboxes[worker_id].put(("path", node_id))
+                parent_worker, parent_id, action, g = get_reply(replies, workers)
+                if parent_id == ROOT_PARENT:
+                    break
+                reversed_path.append((ACTIONS[action] if action < len(ACTIONS) else action, g))
+                worker_id, node_id = parent_worker, parent_id
+
+            path = []
+            previous_g = 0
+            for action, g in reversed(reversed_path):
+                path.append((action, g - previous_g))
+                previous_g = g
+            solution = moves.get_solution(initial_state, path)
+
+        for inbox in inboxes:
+            inbox.put(None)
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+
+        solving_time = time.time() - start_time
+        return solution, n_explored_nodes, solving_time
+
+    @staticmethod
+    def parallel_bfs(initial_state: GameState, moves: MoveGenerator = None, n_workers=BFS_WORKERS):
+        """Layer-synchronous BFS: a pool of processes expands each depth layer in parallel.
+
+        The current layer is one packed array of state records in shared
+        memory. Each worker expands a slice of it and sends every child to the
+        worker that owns its Zobrist key. The owner drops the children it has
+        visited before, and the new ones make up the next layer. The first
+        layer that holds a goal gives the same depth as Algorithms.bfs.
+        """
+        start_time = time.time()
+
+        moves = moves or MoveGenerator()
+        root_state = moves.get_initial_state(initial_state)
+        if root_state.is_win():
+            return moves.get_solution(initial_state, []), 1, time.time() - start_time
+
+        n_workers = max(1, n_workers)
+        record_size = 1 + bin(root_state.boxes).count('1')
+        commands = [Queue() for _ in range(n_workers)]
+        exchanges = [Queue() for _ in range(n_workers)]
+        replies = Queue()
+        # Workers must share this process's resource tracker; each would start its
+        # own otherwise and report the layers, unlinked here, as leaked
+        resource_tracker.ensure_running()
+        workers = [
+            Process(target=parallel_bfs_worker,
+                    args=(worker_id, initial_state, moves, commands[worker_id], exchanges, replies, os.getpid()),
+                    daemon=True)
+            for worker_id in range(n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        layers = []  # Per depth after the root: (parents, actions, costs) of every state in the layer
+        layer_records = encode_state(root_state)
+        goal = -1
+        n_explored_nodes = 0
+
+        while layer_records and goal < 0:
+            n_states = len(layer_records) // (2 * record_size)
+            n_explored_nodes += n_states
+            shm = SharedMemory(create=True, size=len(layer_records))
+            try:
+                shm.buf[:len(layer_records)] = layer_records
+                slice_size = -(-n_states // n_workers)
+                for worker_id, command_queue in enumerate(commands):
+                    start = min(worker_id * slice_size, n_states)
+                    command_queue.put((shm.name, n_states, start, min(start + slice_size, n_states)))
+                results = sorted(get_reply(replies, workers) for _ in range(n_workers))
+            finally:
+                shm.close()
+                shm.unlink()
+
+            # Concatenate the workers' partitions into the next layer
+            parents, actions, costs = array('i'), array('i'), array('i')
+            for _, records, worker_parents, worker_actions, worker_costs, worker_goal in results:
+                if worker_goal >= 0 and goal < 0:
+                    goal = len(parents) + worker_goal
+                parents.extend(worker_parents)
+                actions.extend(worker_actions)
+                costs.extend(worker_costs)
+            layers.append((parents, actions, costs))
+            layer_records = b''.join(result[1] for result in results)
+
+        for command_queue in commands:
+            command_queue.put(None)
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+
+        solving_time = time.time() - start_time
+        if goal < 0:
+            return None, n_explored_nodes, solving_time
+
+        path = []
+        index = goal
+        for parents, actions, costs in reversed(layers):
+            action = actions[index]
+            path.append((ACTIONS[action] if action < len(ACTIONS) else action, costs[index]))
+            index = parents[index]
+        return moves.get_solution(initial_state, path[::-1]), n_explored_nodes, solving_time
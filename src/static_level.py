@@ -0,0 +1,152 @@
+import hashlib
+import random
+
+ACTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+
+DIRECTIONS = {
+    'UP': (-1, 0),
+    'DOWN': (1, 0),
+    'LEFT': (0, -1),
+    'RIGHT': (0, 1)
+}
+
+ZOBRIST_SEED = 0x50C0BA
+
+# Bit flags in StaticLevel.tunnels: the cell is one wide across that axis
+TUNNEL_HORIZONTAL = 1  # Walls above and below
+TUNNEL_VERTICAL = 2  # Walls left and right
+
+
+def iter_cells(mask):
+    """Yields the cell index of every bit set in a box bitmask."""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class StaticLevel:
+    """Per-level data (walls, goals, dimensions) built once and shared by all states.
+
+    Nothing here changes after load_map builds it. Cells are numbered row-major
+    on a grid padded with one ring of walls, so a neighbour offset never leaves
+    the grid and a set of boxes fits in one int bitmask.
+    """
+
+    __slots__ = ('map_dims', 'width', 'n_cells', 'walls', 'goal_mask',
+                 'wall_positions', 'goal_positions', 'offsets',
+                 'zobrist_player', 'zobrist_boxes', 'dead_squares', 'tunnels',
+                 'tables')
+
+    def __init__(self, wall_positions, goal_positions, map_dims):
+        rows, cols = map_dims
+        width = cols + 2
+        n_cells = (rows + 2) * width
+
+        walls = bytearray(n_cells)
+        for r in range(rows + 2):
+            for c in range(width):
+                if r in (0, rows + 1) or c in (0, cols + 1) or (r - 1, c - 1) in wall_positions:
+                    walls[r * width + c] = 1
+
+        goal_mask = 0
+        for pos in goal_positions:
+            goal_mask |= 1 << ((pos[0] + 1) * width + pos[1] + 1)
+
+        self.map_dims = tuple(map_dims)  # (rows, cols)
+        self.width = width
+        self.n_cells = n_cells
+        self.walls = bytes(walls)
+        self.goal_mask = goal_mask
+        self.wall_positions = frozenset(map(tuple, wall_positions))
+        self.goal_positions = frozenset(map(tuple, goal_positions))
+        self.offsets = {action: dr * width + dc for action, (dr, dc) in DIRECTIONS.items()}
+
+        # One random 64-bit key per cell for the player and for a box; a state's
+        # hash is the XOR of its keys, so a move only XORs the changed cells.
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist_player = tuple(rng.getrandbits(64) for _ in range(n_cells))
+        self.zobrist_boxes = tuple(rng.getrandbits(64) for _ in range(n_cells))
+
+        self.dead_squares = self._compute_dead_squares()
+        self.tunnels = self._compute_tunnels()
+        self.tables = None  # LevelTables, see get_level_tables
+
+    def _compute_dead_squares(self):
+        """Marks with 1 every cell from which a lone box can never be pushed onto a goal.
+
+        Works backwards from every goal with "pull" moves. A box on cell y can
+        have come from x = y - d if the player had room to stand on x - d.
+        """
+        walls = self.walls
+        offsets = tuple(self.offsets.values())
+        live = bytearray(self.n_cells)
+        stack = list(iter_cells(self.goal_mask))
+        for goal in stack:
+            live[goal] = 1
+
+        while stack:
+            cell = stack.pop()
+            for offset in offsets:
+                prev_cell = cell - offset
+                if live[prev_cell] or walls[prev_cell] or walls[prev_cell - offset]:
+                    continue
+                live[prev_cell] = 1
+                stack.append(prev_cell)
+
+        return bytes(1 - is_live for is_live in live)
+
+    def _compute_tunnels(self):
+        """Flags every floor cell that sits in a one-wide corridor (TUNNEL_HORIZONTAL / TUNNEL_VERTICAL)."""
+        walls = self.walls
+        width = self.width
+        tunnels = bytearray(self.n_cells)
+        for cell in range(width, self.n_cells - width):
+            if walls[cell]:
+                continue
+            if walls[cell - width] and walls[cell + width]:
+                tunnels[cell] |= TUNNEL_HORIZONTAL
+            if walls[cell - 1] and walls[cell + 1]:
+                tunnels[cell] |= TUNNEL_VERTICAL
+        return bytes(tunnels)
+
+    def get_tunnel_flag(self, action):
+        """Tunnel flag of the corridors that action moves along."""
+        return TUNNEL_HORIZONTAL if action in ('LEFT', 'RIGHT') else TUNNEL_VERTICAL
+
+    def to_cell(self, pos):
+        return (pos[0] + 1) * self.width + pos[1] + 1
+
+    def to_pos(self, cell):
+        r, c = divmod(cell, self.width)
+        return r - 1, c - 1
+
+    def to_mask(self, positions):
+        mask = 0
+        for pos in positions:
+            mask |= 1 << self.to_cell(pos)
+        return mask
+
+    def to_positions(self, mask):
+        return frozenset(self.to_pos(cell) for cell in iter_cells(mask))
+
+    def zobrist_key(self, player, boxes):
+        """Computes a state's Zobrist key from scratch."""
+        key = self.zobrist_player[player]
+        for cell in iter_cells(boxes):
+            key ^= self.zobrist_boxes[cell]
+        return key
+
+    def is_wall_cell(self, cell):
+        return self.walls[cell] == 1
+
+    def is_goal_cell(self, cell):
+        return (self.goal_mask >> cell) & 1 == 1
+
+    def layout_hash(self):
+        """Hex digest of the walls and goals; identical layouts share per-level caches."""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(self.width.to_bytes(4, 'little'))
+        digest.update(self.walls)
+        digest.update(self.goal_mask.to_bytes((self.n_cells + 7) // 8, 'little'))
+        return digest.hexdigest()
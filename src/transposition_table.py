@@ -0,0 +1,46 @@
+from array import array
+
+from config import IDA_TABLE_BITS
+
+
+class TranspositionTable:
+    """Fixed-size table of the cheapest g seen per state, in flat arrays indexed by Zobrist key.
+
+    Each slot holds the full 64-bit key, the g, the iteration that stored it
+    and the node's depth in the search tree. Iteration 0 marks an empty slot.
+    When two states share a slot the shallower node wins (replace-by-depth):
+    its subtree is the larger one, so its entry prunes more. The memory use
+    stays at 1 << bits slots whatever the size of the search.
+    """
+
+    def __init__(self, bits=IDA_TABLE_BITS):
+        n_slots = 1 << bits
+        self.mask = n_slots - 1
+        self.keys = array('Q', bytes(8 * n_slots))
+        self.costs = array('I', bytes(4 * n_slots))
+        self.iterations = array('I', bytes(4 * n_slots))
+        self.depths = array('H', bytes(2 * n_slots))
+
+        self.n_stores = 0
+        self.n_prunes = 0
+
+    def is_dominated(self, key, g, iteration):
+        """True if a path as cheap was already searched: a lower g, or the same g earlier in this iteration."""
+        slot = key & self.mask
+        if not self.iterations[slot] or self.keys[slot] != key:
+            return False
+        stored_g = self.costs[slot]
+        if stored_g < g or (stored_g == g and self.iterations[slot] == iteration):
+            self.n_prunes += 1
+            return True
+        return False
+
+    def store(self, key, g, iteration, depth):
+        slot = key & self.mask
+        if self.iterations[slot] and self.keys[slot] != key and self.depths[slot] < depth:
+            return  # Keep the shallower node
+        self.keys[slot] = key
+        self.costs[slot] = g
+        self.iterations[slot] = iteration
+        self.depths[slot] = min(depth, 0xFFFF)
+        self.n_stores += 1
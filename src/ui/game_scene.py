@@ -86,7 +86,7 @@ class GameScene:
         algo_x = x - spacing - BUTTON_WIDTH
         algo_y = algorithm_button.y
 
-        algo_names = list(GameManager.algorithms.keys())
+        algo_names = GameManager.available_algo_names
         y_offset = algo_y
 
         for name in algo_names:
@@ -100,6 +100,10 @@ class GameScene:
             )
             self.algo_buttons[name] = button
             y_offset += BUTTON_HEIGHT + spacing
+            if y_offset + BUTTON_HEIGHT > SCREEN_HEIGHT:
+                # Column is full: continue in a new column to the left
+                algo_x -= BUTTON_WIDTH + spacing
+                y_offset = algo_y
 
         map_x = x - spacing - BUTTON_WIDTH
         map_y = map_button.y
@@ -233,7 +237,7 @@ class GameScene:
 
         algo_name = self.control_buttons["ALGORITHM"].get_text()
         algo_name = self.control_buttons["ALGORITHM"].get_text()
-        if algo_name not in GameManager.algorithms:
+        if algo_name not in GameManager.available_algo_names:
             GameManager.status_message = f"ERROR: Algorithm '{algo_name}' is not available."
             return
 
@@ -148,13 +148,14 @@ class Renderer:
             screen.blit(Renderer.wall_sprite, (c * tile_size, r * tile_size))
 
         # Draw goals: pressed if box on goal, else normal
+        box_positions = game_state.box_positions
         for (r, c) in game_state.goal_positions:
-            if (r, c) in game_state.box_positions:
+            if (r, c) in box_positions:
                 screen.blit(Renderer.goal_pressed_sprite, (c * tile_size, r * tile_size))
             else:
                 screen.blit(Renderer.goal_sprite, (c * tile_size, r * tile_size))
 
-        for (r, c) in game_state.box_positions:
+        for (r, c) in box_positions:
             screen.blit(Renderer.box_sprite, (c * tile_size, r * tile_size))
 
         pr, pc = game_state.player_pos